@@ -0,0 +1,88 @@
+from collections import defaultdict  # Импорт defaultdict для группировки позиций заказа по цветам
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import db, Order, OrderItem, SalesDaily, SalesByFlower, SalesByUser
+
+
+# Функция для прибавления значений к строке сводки. Для SQLite и PostgreSQL используется
+# INSERT ... ON CONFLICT DO UPDATE, для остальных баз данных — UPDATE с INSERT при отсутствии строки
+def _increment(model, keys, increments, values=None):
+    values = values or {}
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        dialect_insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        stmt = dialect_insert(model).values(**keys, **increments, **values)
+        changes = {name: getattr(model, name) + stmt.excluded[name] for name in increments}
+        changes.update(values)
+        db.session.execute(stmt.on_conflict_do_update(index_elements=list(keys), set_=changes))
+        return
+
+    conditions = [getattr(model, name) == value for name, value in keys.items()]
+    changes = {name: getattr(model, name) + value for name, value in increments.items()}
+    changes.update(values)
+    result = db.session.execute(update(model).where(*conditions).values(**changes))
+    if result.rowcount == 0:
+        db.session.execute(insert(model).values(**keys, **increments, **values))
+
+
+# Функция для учёта нового заказа в сводках. Вызывается до commit,
+# поэтому сводки меняются в той же транзакции, что и сам заказ
+def record_order(order, items):
+    items_count = sum(item['quantity'] for item in items)
+    revenue = sum(item['quantity'] * item['price'] for item in items)
+
+    if order.created_at is not None:
+        _increment(SalesDaily, {'day': order.created_at.date()},
+                   {'orders_count': 1, 'items_count': items_count, 'revenue': revenue})
+    _increment(SalesByUser, {'user_id': order.user_id},
+               {'orders_count': 1, 'items_count': items_count, 'revenue': revenue})
+
+    by_flower = defaultdict(lambda: [None, 0, 0.0])
+    for item in items:
+        entry = by_flower[item['flower_name']]
+        entry[0] = item['flower_id']
+        entry[1] += item['quantity']
+        entry[2] += item['quantity'] * item['price']
+    for flower_name, (flower_id, quantity, flower_revenue) in by_flower.items():
+        _increment(SalesByFlower, {'flower_name': flower_name},
+                   {'orders_count': 1, 'quantity': quantity, 'revenue': flower_revenue},
+                   {'flower_id': flower_id})
+
+
+# Функция для получения дня из времени создания заказа средствами базы данных
+def _order_day():
+    if db.session.get_bind().dialect.name == 'sqlite':
+        return func.date(Order.created_at)
+    return func.cast(Order.created_at, db.Date)
+
+
+# Функция для полного пересчёта сводок по таблицам заказов (для заполнения и исправления данных).
+# Агрегация выполняется запросами INSERT ... SELECT без загрузки заказов в Python
+def rebuild_rollups():
+    for model in (SalesDaily, SalesByFlower, SalesByUser):
+        db.session.execute(delete(model))
+
+    line_revenue = OrderItem.quantity * OrderItem.price
+    day = _order_day()
+    db.session.execute(insert(SalesDaily).from_select(
+        ['day', 'orders_count', 'items_count', 'revenue'],
+        select(day, func.count(func.distinct(Order.id)), func.sum(OrderItem.quantity), func.sum(line_revenue))
+        .join(OrderItem, OrderItem.order_id == Order.id)
+        .where(Order.created_at.isnot(None))
+        .group_by(day)
+    ))
+    db.session.execute(insert(SalesByFlower).from_select(
+        ['flower_name', 'flower_id', 'orders_count', 'quantity', 'revenue'],
+        select(OrderItem.flower_name, func.max(OrderItem.flower_id), func.count(func.distinct(OrderItem.order_id)),
+               func.sum(OrderItem.quantity), func.sum(line_revenue))
+        .group_by(OrderItem.flower_name)
+    ))
+    db.session.execute(insert(SalesByUser).from_select(
+        ['user_id', 'orders_count', 'items_count', 'revenue'],
+        select(Order.user_id, func.count(func.distinct(Order.id)), func.sum(OrderItem.quantity), func.sum(line_revenue))
+        .join(OrderItem, OrderItem.order_id == Order.id)
+        .group_by(Order.user_id)
+    ))
+    db.session.commit()
@@ -0,0 +1,226 @@
+import gzip  # Импорт gzip для предварительного сжатия текстовых ресурсов
+import hashlib  # Импорт hashlib для вычисления отпечатков содержимого файлов
+import io  # Импорт io для сохранения изображений в память
+import json  # Импорт json для хранения манифеста ресурсов
+import os  # Импорт os для работы с файлами
+import tempfile  # Импорт tempfile для атомарной записи файлов
+from contextlib import contextmanager  # Импорт contextmanager для межпроцессной блокировки манифеста
+import threading  # Импорт threading для блокировки при обновлении манифеста
+import time  # Импорт time для периодической проверки манифеста
+
+from flask import current_app, url_for
+from werkzeug.security import safe_join
+
+try:
+    import fcntl  # Блокировка файлов в Linux и macOS
+except ImportError:
+    fcntl = None
+    import msvcrt  # Блокировка файлов в Windows
+
+# Библиотека Pillow импортируется внутри функций: она нужна только при генерации изображений
+
+# Параметры сохранения производных изображений по форматам
+IMAGE_SAVE_OPTIONS = {
+    'webp': {'format': 'WEBP', 'method': 6},
+    'jpeg': {'format': 'JPEG', 'optimize': True, 'progressive': True},
+}
+
+# Текстовые ресурсы, для которых создаются копии с отпечатком и сжатые версии
+TEXT_ASSETS = ('style.css',)
+
+
+# Функция для получения короткого отпечатка содержимого
+def fingerprint(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+# Функция для атомарной записи файла в директорию ресурсов
+def _write_file(directory, name, data):
+    path = os.path.join(directory, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+# Функция для записи файла с отпечатком содержимого в имени (например, images/rose-100.3f2a9c1b7d0e.webp).
+# Такой файл никогда не меняется, поэтому его можно кэшировать в браузере без ограничения срока
+def _write_fingerprinted(directory, stem, extension, data):
+    name = '{}.{}.{}'.format(stem, fingerprint(data), extension)
+    if not os.path.exists(os.path.join(directory, name)):
+        _write_file(directory, name, data)
+    return name
+
+
+# Функция для межпроцессной блокировки на время изменения файла: блокировка берётся
+# на отдельный файл рядом с ним и снимается при закрытии файла, в том числе при завершении процесса
+@contextmanager
+def _file_lock(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+# Класс манифеста ресурсов: соответствие исходных файлов и их копий с отпечатками.
+# Манифест хранится в файле рядом с ресурсами и перечитывается, когда его меняет другой процесс
+class AssetManifest:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = None  # Содержимое манифеста или None, если он ещё не прочитан
+        self._mtime = None  # Время изменения файла, из которого прочитан манифест
+        self._checked_at = 0.0  # Время последней проверки файла
+
+    # Метод для получения пути к файлу манифеста
+    @staticmethod
+    def _path():
+        return os.path.join(current_app.config['ASSETS_DIR'], 'manifest.json')
+
+    # Метод для чтения манифеста с диска
+    def _load(self):
+        try:
+            with open(self._path(), encoding='utf-8') as f:
+                return os.fstat(f.fileno()).st_mtime, json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None, {'images': {}, 'assets': {}}
+
+    # Метод для получения манифеста; файл проверяется не чаще раза в CATALOG_VERSION_CHECK_INTERVAL секунд
+    def data(self):
+        now = time.monotonic()
+        interval = current_app.config.get('CATALOG_VERSION_CHECK_INTERVAL', 1.0)
+        with self._lock:
+            if self._data is not None and now - self._checked_at < interval:
+                return self._data
+            try:
+                mtime = os.stat(self._path()).st_mtime
+            except FileNotFoundError:
+                mtime = None
+            if self._data is None or mtime != self._mtime:
+                self._mtime, self._data = self._load()
+            self._checked_at = now
+            return self._data
+
+    # Метод для получения версии манифеста (времени изменения его файла или None, если он не собран)
+    def version(self):
+        self.data()
+        return self._mtime
+
+    # Метод для изменения манифеста: свежая копия читается с диска, изменяется и записывается атомарно.
+    # Чтение и запись выполняются под блокировкой файла manifest.lock, поэтому одновременные
+    # изменения из нескольких процессов (например, параллельных build_assets) не теряются
+    def update(self, section, key, value):
+        lock_path = os.path.join(current_app.config['ASSETS_DIR'], 'manifest.lock')
+        with self._lock, _file_lock(lock_path):
+            _, data = self._load()
+            data.setdefault(section, {})[key] = value
+            _write_file(current_app.config['ASSETS_DIR'], 'manifest.json',
+                        json.dumps(data, ensure_ascii=False, sort_keys=True, indent=1).encode('utf-8'))
+            self._data = None
+
+
+# Общий экземпляр манифеста ресурсов для процесса
+asset_manifest = AssetManifest()
+
+
+# Функция для генерации уменьшенных копий изображения цветка во всех размерах и форматах.
+# Изображение обрезается до квадрата, как оно показывается в каталоге. Если исходный файл
+# не изменился с прошлой генерации, ничего не делается (кроме случая force=True)
+def build_image(image_url, force=False):
+    from PIL import Image, ImageOps
+
+    config = current_app.config
+    source_path = safe_join(current_app.static_folder, image_url)
+    if source_path is None:
+        raise ValueError('Недопустимый путь к изображению: {}'.format(image_url))
+    with open(source_path, 'rb') as f:
+        source = f.read()
+    source_hash = fingerprint(source)
+    entry = asset_manifest.data()['images'].get(image_url)
+    if entry and entry['source'] == source_hash and not force:
+        return False
+
+    stem = os.path.splitext(image_url)[0]
+    variants = {}
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        # Размеры больше исходного изображения не создаются (кроме самого маленького): увеличение только добавит байтов
+        sizes = sorted(config['IMAGE_SIZES'])
+        sizes = [size for size in sizes if size <= min(image.size)] or sizes[:1]
+        for size in sizes:
+            thumbnail = ImageOps.fit(image, (size, size), Image.LANCZOS)
+            for image_format in config['IMAGE_FORMATS']:
+                buffer = io.BytesIO()
+                thumbnail.save(buffer, quality=config['IMAGE_QUALITY'], **IMAGE_SAVE_OPTIONS[image_format])
+                name = _write_fingerprinted(config['ASSETS_DIR'], '{}-{}'.format(stem, size),
+                                            'jpg' if image_format == 'jpeg' else image_format, buffer.getvalue())
+                variants.setdefault(image_format, {})[str(size)] = name
+    asset_manifest.update('images', image_url, {'source': source_hash, 'variants': variants})
+    return True
+
+
+# Функция для генерации изображений цветов после их создания или изменения.
+# Ошибка в одном изображении (нет файла, не изображение) не отменяет изменение каталога:
+# такой цветок показывается с исходным файлом
+def build_flower_images(image_urls):
+    for image_url in set(image_urls):
+        try:
+            build_image(image_url)
+        except (OSError, ValueError) as error:
+            current_app.logger.warning('Не удалось обработать изображение %s: %s', image_url, error)
+
+
+# Функция для создания копии текстового ресурса с отпечатком и его сжатой версии (.gz)
+def build_text_asset(filename):
+    with open(os.path.join(current_app.static_folder, filename), 'rb') as f:
+        data = f.read()
+    stem, extension = os.path.splitext(filename)
+    directory = current_app.config['ASSETS_DIR']
+    name = _write_fingerprinted(directory, stem, extension.lstrip('.'), data)
+    if not os.path.exists(os.path.join(directory, name + '.gz')):
+        _write_file(directory, name + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+    asset_manifest.update('assets', filename, name)
+    return name
+
+
+# Функция для получения URL ресурса: копии с отпечатком, если она собрана, иначе исходного файла
+def asset_url(filename):
+    name = asset_manifest.data()['assets'].get(filename)
+    if name:
+        return url_for('main.asset', filename=name)
+    return url_for('static', filename=filename)
+
+
+# Функция для получения адресов изображения цветка для шаблона: src, srcset в JPEG и srcset в WebP.
+# Если производные изображения не собраны, используется исходный файл
+def flower_image(image_url):
+    entry = asset_manifest.data()['images'].get(image_url)
+    if not entry:
+        return {'src': url_for('static', filename=image_url), 'srcset': None, 'webp': None}
+
+    # Функция для построения srcset из размеров (первый размер соответствует 1x)
+    def srcset(variants):
+        sizes = sorted(variants, key=int)
+        base = int(sizes[0])
+        return ', '.join('{} {}x'.format(url_for('main.asset', filename=variants[size]), int(size) // base)
+                         for size in sizes)
+
+    variants = entry['variants']
+    jpeg = variants.get('jpeg')
+    webp = variants.get('webp')
+    return {
+        'src': url_for('main.asset', filename=jpeg[min(jpeg, key=int)]) if jpeg else url_for('static', filename=image_url),
+        'srcset': srcset(jpeg) if jpeg else None,
+        'webp': srcset(webp) if webp else None,
+    }
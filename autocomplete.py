@@ -0,0 +1,145 @@
+import threading  # Импорт threading для блокировки при обновлении индекса
+from bisect import bisect_left, insort  # Импорт bisect для поиска диапазона по префиксу в отсортированном массиве
+
+from models import normalize_name
+from catalog import catalog_cache
+
+# Символ больше любого символа названия: верхняя граница диапазона строк с заданным префиксом
+MAX_CHAR = '\U0010ffff'
+
+# Доля изменённых записей, начиная с которой индекс перестраивается целиком, а не по отдельным записям
+REBUILD_FRACTION = 0.25
+
+
+# Функция для получения записей индекса для цветка: полное нормализованное название
+# и каждое следующее слово названия с остатком (чтобы "крас" находило "Роза красная")
+def index_terms(record):
+    words = record.search_name.split()
+    name = ' '.join(words)
+    return [(name, record.id)], [(' '.join(words[i:]), record.id) for i in range(1, len(words))]
+
+
+# Функция для получения диапазона [lo, hi) записей, начинающихся с префикса
+def prefix_range(entries, prefix, lo=0, hi=None):
+    hi = len(entries) if hi is None else hi
+    return bisect_left(entries, (prefix,), lo, hi), bisect_left(entries, (prefix + MAX_CHAR,), lo, hi)
+
+
+# Функция для перебора различных следующих символов в диапазоне записей с префиксом:
+# для каждого символа возвращается (символ, начало, конец поддиапазона)
+def next_chars(entries, prefix, lo, hi):
+    position = len(prefix)
+    while lo < hi and len(entries[lo][0]) == position:
+        lo += 1
+    while lo < hi:
+        char = entries[lo][0][position]
+        end = bisect_left(entries, (prefix + char + MAX_CHAR,), lo, hi)
+        yield char, lo, end
+        lo = end
+
+
+# Функция для поиска диапазонов записей, префикс которых отличается от запроса не более чем
+# на одну правку (замена, вставка, пропуск символа или перестановка соседних символов).
+# Обход идёт по отсортированному массиву как по префиксному дереву
+def fuzzy_ranges(entries, query):
+    ranges = []
+
+    def walk(prefix, lo, hi, rest, edits):
+        if lo >= hi:
+            return
+        if not edits:
+            # Правок больше не осталось: остаток запроса должен совпасть целиком
+            lo, hi = prefix_range(entries, prefix + rest, lo, hi)
+            if lo < hi:
+                ranges.append((lo, hi))
+            return
+        if not rest:
+            ranges.append((lo, hi))
+            return
+        walk(prefix + rest[0], *prefix_range(entries, prefix + rest[0], lo, hi), rest[1:], edits)
+        walk(prefix, lo, hi, rest[1:], 0)
+        if len(rest) > 1 and rest[0] != rest[1]:
+            swapped = prefix + rest[1] + rest[0]
+            walk(swapped, *prefix_range(entries, swapped, lo, hi), rest[2:], 0)
+        for char, start, end in next_chars(entries, prefix, lo, hi):
+            if char != rest[0]:
+                walk(prefix + char, start, end, rest[1:], 0)
+                walk(prefix + char, start, end, rest, 0)
+
+    walk('', 0, len(entries), query, 1)
+    return ranges
+
+
+# Класс префиксного индекса названий цветов в памяти процесса. Индекс строится из записей кэша
+# каталога и обновляется при смене версии каталога: изменённые цветы удаляются из отсортированных
+# массивов и вставляются заново, поэтому подсказки не обращаются к базе данных
+class PrefixIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._source = None  # Кортеж записей кэша каталога, из которого построен индекс
+        self._records = {}  # Идентификатор цветка -> FlowerRecord
+        self._names = []  # Отсортированные пары (полное название, идентификатор)
+        self._words = []  # Отсортированные пары (название с i-го слова, идентификатор)
+
+    # Метод для обновления индекса по новым записям каталога
+    def _update(self, source):
+        records = {record.id: record for record in source}
+        changed = {record_id for record_id, record in records.items() if self._records.get(record_id) != record}
+        changed.update(record_id for record_id in self._records if record_id not in records)
+        if len(changed) > len(records) * REBUILD_FRACTION:
+            names, words = [], []
+            for record in source:
+                record_names, record_words = index_terms(record)
+                names.extend(record_names)
+                words.extend(record_words)
+            self._names, self._words = sorted(names), sorted(words)
+        else:
+            for record_id in changed:
+                for entries, terms in zip((self._names, self._words), self._terms(self._records.get(record_id))):
+                    for term in terms:
+                        del entries[bisect_left(entries, term)]
+                for entries, terms in zip((self._names, self._words), self._terms(records.get(record_id))):
+                    for term in terms:
+                        insort(entries, term)
+        self._records = records
+        self._source = source
+
+    # Метод для получения записей индекса цветка (пустые списки, если цветка нет)
+    @staticmethod
+    def _terms(record):
+        return index_terms(record) if record is not None else ([], [])
+
+    # Метод для поиска подсказок: сначала названия, начинающиеся с запроса, затем названия,
+    # в которых с запроса начинается одно из слов, затем (если подсказок не хватает и запрос
+    # не короче typo_min_length) названия с одной опечаткой. В первых двух группах — по алфавиту
+    def suggest(self, query, limit, typo_min_length):
+        query = ' '.join(normalize_name(query).split())
+        if not query:
+            return []
+        source = catalog_cache.records()
+        with self._lock:
+            if source is not self._source:
+                self._update(source)
+            records, names, words = self._records, self._names, self._words
+
+            found = {}
+            for entries in (names, words):
+                lo, hi = prefix_range(entries, query)
+                for index in range(lo, hi):
+                    if len(found) >= limit:
+                        break
+                    found.setdefault(entries[index][1], False)
+            if len(found) < limit and len(query) >= typo_min_length:
+                for entries in (names, words):
+                    if len(found) >= limit:
+                        break
+                    for lo, hi in fuzzy_ranges(entries, query):
+                        for index in range(lo, hi):
+                            if len(found) >= limit:
+                                break
+                            found.setdefault(entries[index][1], True)
+        return [(records[record_id], typo) for record_id, typo in found.items()]
+
+
+# Общий экземпляр префиксного индекса для процесса
+prefix_index = PrefixIndex()
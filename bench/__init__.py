@@ -0,0 +1 @@
+# Бенчмарки магазина цветов: python -m bench.run --scale 10k
@@ -0,0 +1,97 @@
+import random  # Импорт random для воспроизводимой генерации данных
+from datetime import datetime, timedelta  # Импорт datetime для времени создания заказов
+
+from sqlalchemy import insert, update
+
+from models import db, bcrypt, User, Order, OrderItem, Flower, CatalogVersion, normalize_name
+from search import ensure_search_index
+from analytics import rebuild_rollups
+
+# Масштабы набора данных: количество заказов
+SCALES = {
+    '10k': 10_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+}
+
+# Пароль всех сгенерированных пользователей
+PASSWORD = 'bench'
+
+# Названия, из которых составляются названия цветов
+FLOWER_NAMES = ['Роза', 'Тюльпан', 'Лилия', 'Орхидея', 'Пион', 'Хризантема', 'Гербера', 'Ромашка', 'Ирис', 'Гвоздика']
+FLOWER_IMAGES = ['images/rose.jpg', 'images/tulip.jpg', 'images/lily.jpg', 'images/orchid.jpg']
+
+# Количество строк в одном пакетном INSERT
+CHUNK_SIZE = 10_000
+
+
+# Функция для получения количества пользователей и цветов для заданного количества заказов
+def dataset_size(orders_count):
+    return {
+        'orders': orders_count,
+        'users': max(orders_count // 20, 10),
+        'flowers': min(max(orders_count // 500, 20), 2000),
+    }
+
+
+# Функция для вставки строк пакетами
+def _insert_chunked(model, rows):
+    for start in range(0, len(rows), CHUNK_SIZE):
+        db.session.execute(insert(model), rows[start:start + CHUNK_SIZE])
+
+
+# Функция для генерации пользователей, цветов и заказов в пустой базе данных.
+# При одинаковых seed и масштабе результат всегда одинаков. Первый пользователь — администратор
+def generate(scale, seed=0):
+    size = dataset_size(SCALES[scale])
+    rng = random.Random(seed)
+    db.create_all()
+    ensure_search_index()
+
+    # Один хэш на всех пользователей: генерация не должна тратить время на bcrypt
+    password = bcrypt.generate_password_hash(PASSWORD, rounds=4).decode('utf-8')
+    _insert_chunked(User, [
+        {'id': user_id, 'username': f'user{user_id}', 'email': f'user{user_id}@bench.local', 'password': password,
+         'role': 'admin' if user_id == 1 else 'user', 'last_order_number': 0}
+        for user_id in range(1, size['users'] + 1)
+    ])
+
+    flowers = []
+    for flower_id in range(1, size['flowers'] + 1):
+        name = '{} {}'.format(FLOWER_NAMES[(flower_id - 1) % len(FLOWER_NAMES)], flower_id)
+        flowers.append({
+            'id': flower_id, 'name': name, 'search_name': normalize_name(name),
+            'image_url': rng.choice(FLOWER_IMAGES), 'length': rng.randint(40, 80), 'price': rng.randint(50, 500),
+        })
+    _insert_chunked(Flower, flowers)
+    db.session.add(CatalogVersion(id=1, version=1))
+
+    counters = [0] * (size['users'] + 1)
+    start_time = datetime(2024, 1, 1)
+    orders, items = [], []
+    for order_id in range(1, size['orders'] + 1):
+        user_id = rng.randint(1, size['users'])
+        counters[user_id] += 1
+        chosen = rng.sample(flowers, rng.randint(1, 3))
+        lines = [(flower, rng.randint(1, 15)) for flower in chosen]
+        orders.append({
+            'id': order_id, 'user_id': user_id, 'number': counters[user_id],
+            'name': f'Получатель {order_id}', 'address': f'Улица {rng.randint(1, 500)}, дом {rng.randint(1, 100)}',
+            'flower_type': ','.join(f"{flower['name']} ({quantity} шт.)" for flower, quantity in lines),
+            'message': 'С праздником!', 'created_at': start_time + timedelta(minutes=rng.randint(0, 365 * 24 * 60)),
+        })
+        items.extend({'order_id': order_id, 'flower_id': flower['id'], 'flower_name': flower['name'],
+                      'quantity': quantity, 'price': flower['price']} for flower, quantity in lines)
+        if len(orders) >= CHUNK_SIZE:
+            _insert_chunked(Order, orders)
+            _insert_chunked(OrderItem, items)
+            orders, items = [], []
+    _insert_chunked(Order, orders)
+    _insert_chunked(OrderItem, items)
+
+    db.session.execute(update(User), [
+        {'id': user_id, 'last_order_number': count} for user_id, count in enumerate(counters) if count
+    ])
+    db.session.commit()
+    rebuild_rollups()
+    return size
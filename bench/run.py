@@ -0,0 +1,213 @@
+import argparse  # Импорт argparse для разбора параметров командной строки
+import json  # Импорт json для сохранения результатов и базовых значений
+import os  # Импорт os для работы с путями
+import random  # Импорт random для воспроизводимого выбора запросов
+import shutil  # Импорт shutil для копирования сгенерированной базы данных
+import sys  # Импорт sys для кода завершения
+import tempfile  # Импорт tempfile для рабочей директории прогона
+import time  # Импорт time для измерения задержек
+
+from sqlalchemy import event, func, select
+
+from app import create_app
+from config import Config
+from models import db, Order, Flower
+from bench.datagen import SCALES, generate
+from bench.scenarios import SCENARIOS
+
+# Директория бенчмарков, кэш сгенерированных баз данных и файл с базовыми значениями
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BENCH_DIR, 'data')
+BASELINES_PATH = os.path.join(BENCH_DIR, 'baselines.json')
+
+# Допустимый прирост количества запросов к базе данных на один HTTP-запрос (доля и абсолютное значение)
+QUERIES_TOLERANCE = 0.1
+QUERIES_SLACK = 0.5
+
+# Минимальный прирост задержки в миллисекундах, который считается регрессией (защита от шума на быстрых сценариях)
+LATENCY_SLACK_MS = 1.0
+
+
+# Функция для создания конфигурации прогона: своя база данных и свои директории кэшей
+def make_config(database_path, work_dir):
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + database_path
+        DATABASE_REPLICA_URL = None
+        WTF_CSRF_ENABLED = False
+        BCRYPT_LOG_ROUNDS = 4
+        DOCUMENT_CACHE_DIR = os.path.join(work_dir, 'documents')
+        ASSETS_DIR = os.path.join(work_dir, 'assets')
+    return BenchConfig
+
+
+# Функция для получения пути к сгенерированной базе данных; база создаётся один раз для пары (масштаб, seed)
+def dataset_path(scale, seed, work_dir):
+    path = os.path.join(DATA_DIR, '{}-seed{}.db'.format(scale, seed))
+    if not os.path.exists(path):
+        os.makedirs(DATA_DIR, exist_ok=True)
+        tmp_path = path + '.tmp'
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        print('Генерация данных {} (seed {})...'.format(scale, seed))
+        started = time.perf_counter()
+        app = create_app(make_config(tmp_path, work_dir))
+        with app.app_context():
+            size = generate(scale, seed)
+            db.session.remove()
+            db.engine.dispose()
+        os.replace(tmp_path, path)
+        print('Пользователей: {users}, цветов: {flowers}, заказов: {orders}'.format(**size),
+              '({:.1f} с)'.format(time.perf_counter() - started))
+    return path
+
+
+# Функция для вычисления перцентиля по отсортированному списку
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+# Функция для входа тестового клиента от имени пользователя без проверки пароля
+def login(client, user_id):
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+
+
+# Функция для выполнения одного сценария: прогрев, затем измерение задержки и количества SQL-запросов
+def run_scenario(app, scenario, data, iterations, warmup, seed, counter):
+    saved = {key: app.config[key] for key in scenario.config}
+    app.config.update(scenario.config)
+    try:
+        client = app.test_client()
+        if scenario.user:
+            login(client, data['user_ids'][scenario.user])
+        rng = random.Random(seed)
+        for _ in range(warmup):
+            scenario.request(client, rng, data)
+
+        timings, failures = [], 0
+        counter['queries'] = 0
+        for _ in range(iterations):
+            started = time.perf_counter()
+            response = scenario.request(client, rng, data)
+            timings.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                failures += 1
+        queries = counter['queries']
+    finally:
+        app.config.update(saved)
+
+    timings.sort()
+    return {
+        'requests': iterations,
+        'failures': failures,
+        'p50_ms': round(percentile(timings, 0.5), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'p99_ms': round(percentile(timings, 0.99), 3),
+        'max_ms': round(timings[-1], 3),
+        'queries_per_request': round(queries / iterations, 2),
+    }
+
+
+# Функция для сравнения результата с базовым значением; возвращает список описаний регрессий
+def compare(name, result, baseline, tolerance):
+    problems = []
+    if result['failures']:
+        problems.append('{}: {} запросов завершились ошибкой'.format(name, result['failures']))
+    if baseline is None:
+        return problems
+    limit = max(baseline['p95_ms'] * (1 + tolerance), baseline['p95_ms'] + LATENCY_SLACK_MS)
+    if result['p95_ms'] > limit:
+        problems.append('{}: p95 {:.2f} мс при базовом {:.2f} мс'.format(name, result['p95_ms'], baseline['p95_ms']))
+    queries_limit = baseline['queries_per_request'] * (1 + QUERIES_TOLERANCE) + QUERIES_SLACK
+    if result['queries_per_request'] > queries_limit:
+        problems.append('{}: {} SQL-запросов на запрос при базовом {}'.format(
+            name, result['queries_per_request'], baseline['queries_per_request']))
+    return problems
+
+
+# Функция для загрузки базовых значений
+def load_baselines():
+    try:
+        with open(BASELINES_PATH, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+# Функция для разбора параметров командной строки
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Бенчмарки магазина цветов на тестовом клиенте Flask.')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='10k', help='Масштаб набора данных (количество заказов).')
+    parser.add_argument('--seed', type=int, default=0, help='Seed генератора данных и выбора запросов.')
+    parser.add_argument('--iterations', type=int, default=200, help='Количество измеряемых запросов в сценарии.')
+    parser.add_argument('--warmup', type=int, default=20, help='Количество запросов прогрева в сценарии.')
+    parser.add_argument('--scenario', action='append', help='Запустить только указанные сценарии.')
+    parser.add_argument('--tolerance', type=float, default=0.3, help='Допустимый прирост p95 относительно базового значения.')
+    parser.add_argument('--output', help='Файл для сохранения результатов в JSON.')
+    parser.add_argument('--update-baseline', action='store_true', help='Записать результаты как новые базовые значения.')
+    return parser.parse_args(argv)
+
+
+# Функция для запуска бенчмарков. Код завершения 1 означает регрессию или ошибки в запросах
+def main(argv=None):
+    args = parse_args(argv)
+    scenarios = [scenario for scenario in SCENARIOS if not args.scenario or scenario.name in args.scenario]
+
+    with tempfile.TemporaryDirectory(prefix='flowers-bench-') as work_dir:
+        # Сценарии изменяют данные (создают заказы), поэтому каждый прогон работает с копией базы данных
+        database_path = os.path.join(work_dir, 'bench.db')
+        shutil.copyfile(dataset_path(args.scale, args.seed, work_dir), database_path)
+        app = create_app(make_config(database_path, work_dir))
+
+        counter = {'queries': 0}
+        with app.app_context():
+            # Обработчик для подсчёта SQL-запросов, выполненных во время сценария
+            @event.listens_for(db.engine, 'before_cursor_execute')
+            def count_query(conn, cursor, statement, parameters, context, executemany):
+                counter['queries'] += 1
+
+            user_id = db.session.execute(
+                select(Order.user_id).group_by(Order.user_id).order_by(func.count().desc(), Order.user_id).limit(1)
+            ).scalar()
+            data = {
+                'user_ids': {'user': user_id, 'admin': 1},
+                'order_ids': db.session.execute(select(Order.id).where(Order.user_id == user_id)).scalars().all(),
+                'flower_names': db.session.execute(select(Flower.name).order_by(Flower.id).limit(50)).scalars().all(),
+            }
+            db.session.remove()
+
+        results = {}
+        print('{:<24} {:>9} {:>9} {:>9} {:>9} {:>9}'.format('сценарий', 'p50, мс', 'p95, мс', 'p99, мс', 'max, мс', 'SQL/запр'))
+        for scenario in scenarios:
+            result = run_scenario(app, scenario, data, args.iterations, args.warmup, args.seed, counter)
+            results[scenario.name] = result
+            print('{:<24} {p50_ms:>9.2f} {p95_ms:>9.2f} {p99_ms:>9.2f} {max_ms:>9.2f} {queries_per_request:>9}'.format(
+                scenario.name, **result))
+
+        with app.app_context():
+            db.engine.dispose()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'scale': args.scale, 'seed': args.seed, 'results': results}, f, ensure_ascii=False, indent=2)
+
+    baselines = load_baselines()
+    if args.update_baseline:
+        baselines.setdefault(args.scale, {}).update(results)
+        with open(BASELINES_PATH, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, ensure_ascii=False, indent=2, sort_keys=True)
+            f.write('\n')
+        print('Базовые значения для {} обновлены.'.format(args.scale))
+        return 0
+
+    problems = []
+    for name, result in results.items():
+        problems.extend(compare(name, result, baselines.get(args.scale, {}).get(name), args.tolerance))
+    for problem in problems:
+        print('РЕГРЕССИЯ', problem)
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
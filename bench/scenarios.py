@@ -0,0 +1,107 @@
+from collections import namedtuple  # Импорт namedtuple для описания сценариев
+
+# Сценарий нагрузки: имя, пользователь (None — анонимный, 'user' — покупатель с заказами, 'admin'),
+# переопределения конфигурации на время сценария и функция, выполняющая один запрос
+Scenario = namedtuple('Scenario', ['name', 'user', 'config', 'request'])
+
+# Наборы фильтров каталога, из которых сценарии выбирают случайный запрос
+CATALOG_FILTERS = [
+    {},
+    {'search': 'роза'},
+    {'search': 'Тюльпан 1'},
+    {'length': '50-55'},
+    {'price': '120-150', 'sort': '-price'},
+    {'search': 'ли', 'length': '56-60', 'sort': 'length'},
+    {'page': '2'},
+    {'sort': 'price', 'page': '3'},
+]
+
+# Запрос GraphQL со списком заказов и их пользователями (проверяет пакетную загрузку связей)
+GRAPHQL_ORDERS = '''
+query ($after: String) {
+  orders(first: 100, after: $after) {
+    edges { node { id number name flowerType user { username } } }
+    pageInfo { hasNextPage endCursor }
+  }
+}
+'''
+
+# Запрос GraphQL с фильтрацией цветов и сводкой продаж
+GRAPHQL_FLOWERS = '''
+query ($name: String) {
+  flowers(first: 50, nameContains: $name, minPrice: 100) {
+    edges { node { id name price length } }
+  }
+  salesByFlower(limit: 10) { flowerName quantity revenue }
+}
+'''
+
+# Запрос GraphQL для панели администратора: пользователи с их заказами (вложенный список
+# из пакетного загрузчика должен укладываться в ограничение стоимости запроса)
+GRAPHQL_USERS = '''
+query ($after: String) {
+  users(first: 50, after: $after) {
+    edges { node { id username orders { id number } } }
+  }
+}
+'''
+
+
+# Функция для запроса главной страницы с фильтрами
+def catalog_page(client, rng, data):
+    return client.get('/', query_string=rng.choice(CATALOG_FILTERS))
+
+
+# Функция для запроса JSON API каталога
+def catalog_api(client, rng, data):
+    return client.get('/api/flowers', query_string=rng.choice(CATALOG_FILTERS))
+
+
+# Функция для оформления заказа из одного-трёх случайных цветов
+def order_post(client, rng, data):
+    names = rng.sample(data['flower_names'], rng.randint(1, 3))
+    form = {'name': 'Получатель', 'address': 'Улица 1', 'message': 'Тест', 'flower_type': names}
+    for name in names:
+        form['quantity_' + name.lower()] = str(rng.randint(1, 10))
+    return client.post('/', data=form)
+
+
+# Функция для запроса страницы профиля
+def profile(client, rng, data):
+    return client.get('/profile')
+
+
+# Функция для создания функции скачивания документа заказа пользователя
+def download(kind):
+    def request(client, rng, data):
+        return client.get('/download/{}/{}'.format(kind, rng.choice(data['order_ids'])))
+    return request
+
+
+# Функция для печати накладных за случайный день года, за который сгенерированы заказы
+def delivery_slips(client, rng, data):
+    return client.get('/admin/slips', query_string={'date': '2024-{:02d}-{:02d}'.format(rng.randint(1, 12), rng.randint(1, 28))})
+
+
+# Функция для создания функции запроса GraphQL
+def graphql(query, variables):
+    def request(client, rng, data):
+        return client.post('/graphql', json={'query': query, 'variables': variables(rng, data)})
+    return request
+
+
+# Все сценарии в порядке выполнения. Скачивание документов выполняется с выключенным
+# дисковым кэшем (нулевой размер), чтобы измерялась генерация PDF и DOCX
+SCENARIOS = [
+    Scenario('catalog_page', None, {}, catalog_page),
+    Scenario('catalog_page_uncached', None, {'PAGE_CACHE_ENABLED': False, 'CATALOG_CACHE_ENABLED': False}, catalog_page),
+    Scenario('catalog_api', None, {}, catalog_api),
+    Scenario('order_post', 'user', {}, order_post),
+    Scenario('profile', 'user', {}, profile),
+    Scenario('download_pdf', 'user', {'DOCUMENT_CACHE_MAX_BYTES': 0}, download('pdf')),
+    Scenario('download_docx', 'user', {'DOCUMENT_CACHE_MAX_BYTES': 0}, download('docx')),
+    Scenario('delivery_slips', 'admin', {}, delivery_slips),
+    Scenario('graphql_orders', 'admin', {}, graphql(GRAPHQL_ORDERS, lambda rng, data: {'after': None})),
+    Scenario('graphql_users', 'admin', {}, graphql(GRAPHQL_USERS, lambda rng, data: {'after': None})),
+    Scenario('graphql_flowers', 'admin', {}, graphql(GRAPHQL_FLOWERS, lambda rng, data: {'name': rng.choice(['роза', 'ли', None])})),
+]
@@ -0,0 +1,117 @@
+import threading  # Импорт threading для блокировки при обновлении кэша
+import time  # Импорт time для периодической сверки версии каталога
+from collections import namedtuple  # Импорт namedtuple для компактных неизменяемых записей
+
+from flask import current_app
+from sqlalchemy import select, update
+
+from models import db, Flower, CatalogVersion, normalize_name
+
+# Компактная неизменяемая запись о цветке, которую хранит кэш вместо ORM-объекта
+FlowerRecord = namedtuple('FlowerRecord', ['id', 'name', 'search_name', 'image_url', 'length', 'price'])
+
+
+# Функция для разбора фильтра диапазона вида "50-55"
+def parse_range(value):
+    if not value:
+        return None
+    try:
+        low, high = map(float, value.split('-'))
+    except ValueError:
+        return None
+    return low, high
+
+
+# Функция для приведения диапазона к каноническому виду "50-55" (пустая строка, если фильтра нет)
+def format_range(value):
+    if not value:
+        return ''
+    return '{:g}-{:g}'.format(*value)
+
+
+# Функция для получения текущей версии каталога из базы данных
+def get_catalog_version():
+    version = db.session.execute(select(CatalogVersion.version).where(CatalogVersion.id == 1)).scalar()
+    return version or 0
+
+
+# Функция для увеличения версии каталога в текущей транзакции.
+# Вызывается мутациями до commit, чтобы версия менялась атомарно вместе с данными
+def bump_catalog_version():
+    result = db.session.execute(
+        update(CatalogVersion).where(CatalogVersion.id == 1).values(version=CatalogVersion.version + 1)
+    )
+    if result.rowcount == 0:
+        db.session.add(CatalogVersion(id=1, version=1))
+
+
+# Функция для фиксации изменений каталога: версия увеличивается в той же транзакции,
+# а локальный кэш сбрасывается сразу после commit
+def commit_catalog_change():
+    bump_catalog_version()
+    db.session.commit()
+    catalog_cache.invalidate()
+
+
+# Класс кэша каталога цветов в памяти процесса
+class CatalogCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._records = None  # Кортеж FlowerRecord или None, если кэш пуст
+        self._version = None  # Версия каталога, из которой построен кэш
+        self._checked_at = 0.0  # Время последней сверки версии с базой данных
+
+    # Метод для сброса кэша (следующий запрос перечитает каталог)
+    def invalidate(self):
+        with self._lock:
+            self._records = None
+            self._version = None
+            self._checked_at = 0.0
+
+    # Метод для получения всех записей каталога с учётом версии в базе данных
+    def records(self):
+        now = time.monotonic()
+        interval = current_app.config.get('CATALOG_VERSION_CHECK_INTERVAL', 1.0)
+        with self._lock:
+            if self._records is not None and now - self._checked_at < interval:
+                return self._records
+
+        version = get_catalog_version()
+        with self._lock:
+            if self._records is not None and self._version == version:
+                self._checked_at = now
+                return self._records
+
+        rows = db.session.execute(
+            select(Flower.id, Flower.name, Flower.search_name, Flower.image_url, Flower.length, Flower.price)
+            .order_by(Flower.id)
+        ).all()
+        records = tuple(FlowerRecord(*row) for row in rows)
+        with self._lock:
+            self._records = records
+            self._version = version
+            self._checked_at = now
+        return records
+
+    # Метод для получения версии каталога, из которой построен кэш (с той же периодичностью сверки с базой данных)
+    def version(self):
+        self.records()
+        return self._version
+
+    # Метод для фильтрации каталога по названию, длине и цене без обращения к базе данных
+    def filter(self, search_query='', length_range=None, price_range=None):
+        needle = normalize_name(search_query)
+        result = []
+        for record in self.records():
+            if needle and needle not in record.search_name:
+                continue
+            if length_range and not length_range[0] <= record.length <= length_range[1]:
+                continue
+            if price_range and not price_range[0] <= record.price <= price_range[1]:
+                continue
+            result.append(record)
+        return result
+
+
+# Общий экземпляр кэша каталога для процесса
+catalog_cache = CatalogCache()
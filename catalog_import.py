@@ -0,0 +1,155 @@
+import csv  # Импорт csv для потокового чтения CSV-файлов
+import json  # Импорт json для чтения JSON и JSON Lines
+from collections import namedtuple  # Импорт namedtuple для описания ошибки в строке
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from models import db, Flower, normalize_name
+from catalog import commit_catalog_change
+
+# Ошибка в строке импорта или пакетной мутации: номер строки (с нуля) и описание
+RowError = namedtuple('RowError', ['index', 'message'])
+
+# Поля цветка, которые можно задать при импорте
+FLOWER_FIELDS = ('name', 'image_url', 'length', 'price')
+
+
+# Функция для проверки и приведения типов одной строки каталога.
+# Возвращает словарь значений и None или None и текст ошибки
+def validate_flower_row(row, partial=False):
+    values = {}
+    for field in FLOWER_FIELDS:
+        value = row.get(field)
+        if value is None or value == '':
+            if not partial:
+                return None, 'Не заполнено поле {}'.format(field)
+            continue
+        if field in ('length', 'price'):
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                return None, 'Поле {} должно быть числом'.format(field)
+            if value < 0:
+                return None, 'Поле {} не может быть отрицательным'.format(field)
+        else:
+            value = str(value).strip()
+            limit = Flower.__table__.columns[field].type.length
+            if not value or len(value) > limit:
+                return None, 'Поле {} должно содержать от 1 до {} символов'.format(field, limit)
+        values[field] = value
+    if row.get('id') not in (None, ''):
+        try:
+            values['id'] = int(row['id'])
+        except (TypeError, ValueError):
+            return None, 'Поле id должно быть целым числом'
+    return values, None
+
+
+# Функция для потокового чтения строк каталога из CSV, JSON Lines (.jsonl) или JSON-массива (.json).
+# JSON-массив читается целиком, поэтому для больших каталогов лучше использовать CSV или JSON Lines
+def read_rows(path):
+    if path.endswith('.csv'):
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            yield from csv.DictReader(f)
+    elif path.endswith('.jsonl'):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        with open(path, encoding='utf-8') as f:
+            yield from json.load(f)
+
+
+# Функция для записи одной порции строк: существующие цветы (по id или по названию)
+# обновляются, новые добавляются одним пакетным INSERT
+def _upsert_chunk(chunk):
+    names = [values['name'] for values in chunk if 'id' not in values]
+    existing = {}
+    if names:
+        for flower_id, name in db.session.execute(
+            select(Flower.id, Flower.name).where(Flower.name.in_(names)).order_by(Flower.id.desc())
+        ):
+            existing[name] = flower_id
+
+    # Повторяющиеся в порции названия без id схлопываются: действует последняя строка
+    by_name = {}
+    for values in chunk:
+        by_name[values['name'] if 'id' not in values else ('id', values['id'])] = values
+
+    inserts, updates = [], []
+    for values in by_name.values():
+        values = dict(values, search_name=normalize_name(values['name']))
+        flower_id = values.pop('id', None) or existing.get(values['name'])
+        if flower_id is None:
+            inserts.append(values)
+        else:
+            updates.append(dict(values, id=flower_id))
+
+    if inserts:
+        db.session.execute(insert(Flower), inserts)
+    if updates:
+        db.session.execute(update(Flower), updates)
+    commit_catalog_change()
+    return len(inserts), len(updates)
+
+
+# Функция для записи порции пар (номер строки, значения). Строки с id, которого нет в базе данных,
+# не записываются и попадают в ошибки. Если порция не записалась целиком, строки записываются
+# по одной, чтобы ошибку базы данных получили только строки, которые действительно не сохранены.
+# Возвращает количество добавленных и обновлённых цветов и список ошибок
+def _write_chunk(chunk):
+    errors = []
+    ids = {values['id'] for _, values in chunk if 'id' in values}
+    if ids:
+        known = set(db.session.scalars(select(Flower.id).where(Flower.id.in_(ids))))
+        errors = [
+            RowError(index, 'Цветок с id {} не найден'.format(values['id']))
+            for index, values in chunk if 'id' in values and values['id'] not in known
+        ]
+        chunk = [(index, values) for index, values in chunk if 'id' not in values or values['id'] in known]
+    if not chunk:
+        return 0, 0, errors
+
+    try:
+        inserted, updated = _upsert_chunk([values for _, values in chunk])
+        return inserted, updated, errors
+    except SQLAlchemyError:
+        db.session.rollback()
+
+    inserted = updated = 0
+    for index, values in chunk:
+        try:
+            added, changed = _upsert_chunk([values])
+        except SQLAlchemyError as error:
+            db.session.rollback()
+            errors.append(RowError(index, 'Ошибка записи в базу данных: {}'.format(getattr(error, 'orig', None) or error)))
+            continue
+        inserted, updated = inserted + added, updated + changed
+    return inserted, updated, errors
+
+
+# Функция для импорта каталога порциями по chunk_size строк: каждая порция записывается
+# одной транзакцией. Возвращает количество добавленных и обновлённых цветов и список ошибок
+def import_flowers(rows, chunk_size=500):
+    inserted = updated = 0
+    errors = []
+    chunk = []
+    for index, row in enumerate(rows):
+        values, error = validate_flower_row(row)
+        if error:
+            errors.append(RowError(index, error))
+            continue
+        chunk.append((index, values))
+        if len(chunk) >= chunk_size:
+            added, changed, chunk_errors = _write_chunk(chunk)
+            inserted, updated = inserted + added, updated + changed
+            errors.extend(chunk_errors)
+            chunk = []
+    if chunk:
+        added, changed, chunk_errors = _write_chunk(chunk)
+        inserted, updated = inserted + added, updated + changed
+        errors.extend(chunk_errors)
+    errors.sort()
+    return inserted, updated, errors
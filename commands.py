@@ -0,0 +1,213 @@
+from flask import Blueprint, current_app
+from models import db, User, Flower
+from catalog import bump_catalog_version
+from search import ensure_search_index
+from export import iter_orders, stream_orders_archive, orders_for_day, delivery_slips_pdf
+from catalog_import import import_flowers, read_rows
+from analytics import rebuild_rollups
+from passwords import password_service, find_taken
+from assets import TEXT_ASSETS, build_image, build_text_asset
+import csv
+import datetime
+import json
+import os
+import subprocess
+import sys
+import click
+
+# Blueprint с командами flask; cli_group=None регистрирует команды без префикса (flask create_admin)
+commands = Blueprint('commands', __name__, cli_group=None)
+
+# Модули, которые не должны загружаться при создании приложения
+LAZY_MODULES = ('docx', 'reportlab', 'graphene', 'graphql', 'flask_graphql', 'schema', 'graphql_documents', 'PIL')
+
+# Команда для создания таблиц и добавления начальных цветов в пустой каталог
+@commands.cli.command('init_db')
+def init_db():
+    db.create_all()
+    ensure_search_index()
+    if not Flower.query.first():
+        flowers = [
+            Flower(name='Роза', image_url='images/rose.jpg', length=51, price=150),
+            Flower(name='Тюльпан', image_url='images/tulip.jpg', length=62, price=120),
+            Flower(name='Лилия', image_url='images/lily.jpg', length=56, price=180)
+        ]
+        db.session.bulk_save_objects(flowers)
+        bump_catalog_version()
+        db.session.commit()
+    print('База данных готова.')
+
+# Команда для создания администратора
+@commands.cli.command('create_admin')
+def create_admin():
+    username = input('Введите имя пользователя: ')
+    email = input('Введите email: ')
+    password = input('Введите пароль: ')
+
+    email_exists, username_exists = find_taken(email, username)
+    if username_exists:
+        print('Пользователь с таким именем уже существует.')
+        return
+    if email_exists:
+        print('Пользователь с таким email уже существует.')
+        return
+
+    hashed_password = password_service.hash(password)
+    admin_user = User(username=username, email=email, password=hashed_password, role='admin')
+    db.session.add(admin_user)
+    db.session.commit()
+    print('Администратор успешно создан.')
+
+# Команда для изменения роли пользователя (например, назначения администратором)
+@commands.cli.command('set_role')
+@click.argument('username')
+@click.argument('role', type=click.Choice(['user', 'admin']))
+def set_role(username, role):
+    user = User.query.filter_by(username=username).first()
+    if not user:
+        print('Пользователь с таким именем не найден.')
+        return
+    user.role = role
+    db.session.commit()
+    print('Роль пользователя {} изменена на {}.'.format(username, role))
+
+# Команда для выгрузки документов заказов в ZIP-архив (всех заказов или заказов одного пользователя)
+@commands.cli.command('export_orders')
+@click.argument('kind', type=click.Choice(['pdf', 'docx']))
+@click.argument('output', type=click.Path(dir_okay=False, writable=True))
+@click.option('--username', default=None, help='Выгрузить только заказы этого пользователя.')
+@click.option('--batch-size', default=200, show_default=True, help='Количество заказов, читаемых из базы данных за раз.')
+def export_orders(kind, output, username, batch_size):
+    user_id = None
+    if username is not None:
+        user = User.query.filter_by(username=username).first()
+        if not user:
+            print('Пользователь с таким именем не найден.')
+            return
+        user_id = user.id
+
+    orders = iter_orders(user_id, batch_size)
+    with open(output, 'wb') as f:
+        for chunk in stream_orders_archive(orders, kind, by_user=user_id is None):
+            f.write(chunk)
+    print('Архив сохранён в {}.'.format(output))
+
+# Команда для печати накладных курьерам: заказы за сутки (по умолчанию текущие, UTC) одним многостраничным PDF
+@commands.cli.command('print_slips')
+@click.argument('output', type=click.Path(dir_okay=False, writable=True))
+@click.option('--date', 'day', type=click.DateTime(formats=['%Y-%m-%d']), default=None, help='Дата заказов в формате ГГГГ-ММ-ДД.')
+def print_slips(output, day):
+    day = day.date() if day is not None else datetime.datetime.utcnow().date()
+    orders = orders_for_day(day)
+    if not orders:
+        print('Заказов за {} нет.'.format(day.isoformat()))
+        return
+    with open(output, 'wb') as f:
+        f.write(delivery_slips_pdf(orders))
+    print('Накладных: {}, файл сохранён в {}.'.format(len(orders), output))
+
+# Команда для импорта каталога цветов из CSV, JSON Lines или JSON с обновлением существующих цветов
+@commands.cli.command('import_flowers')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--chunk-size', default=500, show_default=True, help='Количество строк, записываемых одной транзакцией.')
+@click.option('--report', type=click.Path(dir_okay=False, writable=True), default=None, help='CSV-файл для отчёта об ошибках.')
+def import_flowers_command(path, chunk_size, report):
+    inserted, updated, errors = import_flowers(read_rows(path), chunk_size)
+    print('Добавлено цветов: {}, обновлено: {}, ошибок: {}.'.format(inserted, updated, len(errors)))
+    if report:
+        with open(report, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['row', 'error'])
+            writer.writerows(errors)
+    else:
+        for error in errors:
+            print('Строка {}: {}'.format(error.index + 1, error.message))
+
+# Команда для полного пересчёта сводок продаж по заказам
+@commands.cli.command('rebuild_rollups')
+def rebuild_rollups_command():
+    rebuild_rollups()
+    print('Сводки продаж пересчитаны.')
+
+# Команда для отчёта о времени импорта приложения (python -X importtime) с проверкой бюджета.
+# Завершается с кодом 1, если бюджет превышен или при создании приложения загрузились тяжёлые библиотеки
+@commands.cli.command('import_report')
+@click.option('--top', default=15, show_default=True, help='Количество самых медленных модулей в отчёте.')
+def import_report(top):
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app; app.create_app()'],
+        cwd=current_app.root_path, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        print(result.stderr)
+        sys.exit(1)
+
+    # Строки отчёта имеют вид "import time:  self [us] | cumulative | [отступ]модуль"
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = len(name) - len(name.lstrip()) - 1
+        modules.append((name.strip(), int(cumulative), depth))
+
+    top_level = sorted((module for module in modules if module[2] == 0), key=lambda module: module[1], reverse=True)
+    total_ms = sum(module[1] for module in top_level) / 1000
+    budget_ms = current_app.config['IMPORT_TIME_BUDGET_MS']
+
+    print('Самые медленные модули верхнего уровня:')
+    for name, cumulative, _ in top_level[:top]:
+        print('  {:>8.1f} мс  {}'.format(cumulative / 1000, name))
+    print('Общее время импорта: {:.1f} мс (бюджет {} мс).'.format(total_ms, budget_ms))
+
+    eager = sorted({name for name, _, _ in modules if name.split('.')[0] in LAZY_MODULES})
+    if eager:
+        print('При создании приложения загружены модули, которые должны загружаться лениво: {}.'.format(', '.join(eager)))
+    if eager or total_ms > budget_ms:
+        sys.exit(1)
+
+# Команда для сборки ресурсов: уменьшенные изображения всех цветов в WebP и JPEG,
+# копии style.css с отпечатком в имени и их сжатые версии
+@commands.cli.command('build_assets')
+@click.option('--force', is_flag=True, help='Пересоздать изображения, даже если исходные файлы не изменились.')
+def build_assets(force):
+    image_urls = db.session.execute(db.select(Flower.image_url).distinct()).scalars().all()
+    built = failed = 0
+    for image_url in image_urls:
+        try:
+            built += build_image(image_url, force)
+        except (OSError, ValueError) as error:
+            failed += 1
+            print('Не удалось обработать изображение {}: {}'.format(image_url, error))
+    for filename in TEXT_ASSETS:
+        print('{} -> {}'.format(filename, build_text_asset(filename)))
+    print('Изображений обработано: {}, без изменений: {}, ошибок: {}.'.format(built, len(image_urls) - built - failed, failed))
+
+
+# Команда для сохранения запросов GraphQL из файлов в файл сохранённых запросов (список разрешённых запросов).
+# Запросы проверяются по схеме; выводится хэш, который клиент передаёт вместо текста запроса
+@commands.cli.command('persist_queries')
+@click.argument('paths', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+def persist_queries(paths):
+    from graphql_documents import check_query, load_persisted_queries, query_hash
+    from schema import schema
+    path = current_app.config['GRAPHQL_PERSISTED_QUERIES_FILE']
+    queries = load_persisted_queries(path)
+    failed = 0
+    for query_path in paths:
+        with open(query_path, encoding='utf-8') as f:
+            query = f.read()
+        errors = check_query(schema, query)
+        if errors:
+            failed += 1
+            print('{}: {}'.format(query_path, '; '.join(errors)))
+            continue
+        key = query_hash(query)
+        queries[key] = query
+        print('{} -> {}'.format(query_path, key))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(queries, f, ensure_ascii=False, indent=2, sort_keys=True)
+    print('Сохранено запросов: {}, с ошибками: {}.'.format(len(paths) - failed, failed))
+    if failed:
+        sys.exit(1)
\ No newline at end of file
@@ -0,0 +1,89 @@
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Select, event
+from sqlalchemy.engine import make_url
+
+# Ключ привязки Flask-SQLAlchemy, под которым регистрируется реплика только для чтения
+REPLICA_BIND = 'replica'
+
+# Ключ в session.info: транзакция уже писала в основную базу и до своего завершения читает только из неё
+_PRIMARY_KEY = 'use_primary'
+
+
+# Функция для получения параметров движка по профилю базы данных.
+# Для PostgreSQL настраивается пул соединений, проверка соединения перед выдачей из пула
+# и ограничение времени выполнения запроса; SQLite настраивается через PRAGMA при подключении
+def engine_options(url, config):
+    if make_url(url).get_backend_name() != 'postgresql':
+        return {}
+    return {
+        'pool_size': config['DATABASE_POOL_SIZE'],
+        'max_overflow': config['DATABASE_MAX_OVERFLOW'],
+        'pool_timeout': config['DATABASE_POOL_TIMEOUT'],
+        'pool_recycle': config['DATABASE_POOL_RECYCLE'],
+        'pool_pre_ping': True,
+        'connect_args': {'options': '-c statement_timeout={:d}'.format(config['DATABASE_STATEMENT_TIMEOUT'])},
+    }
+
+
+# Функция для создания обработчика подключения SQLite: журнал WAL позволяет читать во время записи,
+# synchronous=NORMAL убирает fsync на каждый commit, а busy_timeout заставляет писателя ждать
+# освобождения блокировки вместо немедленной ошибки "database is locked"
+def sqlite_pragmas(config):
+    statements = [
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous={}'.format(config['SQLITE_SYNCHRONOUS']),
+        'PRAGMA busy_timeout={:d}'.format(config['SQLITE_BUSY_TIMEOUT']),
+        'PRAGMA mmap_size={:d}'.format(config['SQLITE_MMAP_SIZE']),
+    ]
+
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for statement in statements:
+            cursor.execute(statement)
+        cursor.close()
+    return on_connect
+
+
+# Функция для подключения базы данных к приложению с профилем, выбранным по SQLALCHEMY_DATABASE_URI
+# (и DATABASE_REPLICA_URL для реплики). Заменяет прямой вызов db.init_app(app)
+def init_database(app, db):
+    config = app.config
+    options = config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    for key, value in engine_options(config['SQLALCHEMY_DATABASE_URI'], config).items():
+        options.setdefault(key, value)
+
+    replica_url = config.get('DATABASE_REPLICA_URL')
+    if replica_url:
+        replica = dict(engine_options(replica_url, config), url=replica_url)
+        config.setdefault('SQLALCHEMY_BINDS', {})[REPLICA_BIND] = replica
+
+    db.init_app(app)
+
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', sqlite_pragmas(config))
+
+
+# Класс сессии, который направляет запросы SELECT на реплику, если она настроена.
+# Запись (flush ORM, а также текстовые SQL-запросы и соединение, запрошенное через session.connection())
+# и все запросы транзакции после неё выполняются на основной базе, чтобы транзакция видела собственные изменения
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        primary = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        engines = self._db.engines
+        if bind is not None or REPLICA_BIND not in engines or primary is not engines.get(None):
+            return primary
+        if isinstance(clause, Select) and not self._flushing and not self.info.get(_PRIMARY_KEY):
+            return engines[REPLICA_BIND]
+        # Flush ORM запрашивает привязку только по mapper (clause=None), поэтому признак
+        # устанавливается при любом обращении к основной базе, а не только для запросов с clause
+        self.info[_PRIMARY_KEY] = True
+        return primary
+
+
+# Обработчик завершения транзакции: следующая транзакция снова может читать с реплики
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def reset_primary(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_PRIMARY_KEY, None)
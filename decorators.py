@@ -1,11 +1,13 @@
 from flask import abort
-from flask_login import current_user
+from flask_login import current_user, login_required
 
-def admin_required(f): #проверка на администратора(в основном файле декоратор импортируется и защищает /graphql)
-    def wrap(*args, **kwargs):
-        if current_user.is_authenticated and current_user.role == 'admin':
-            return f(*args, **kwargs)
-        else:
+# Декоратор для проверки прав администратора: неавторизованный пользователь перенаправляется
+# на страницу входа, пользователь без роли admin получает 403 (защищает /graphql, /metrics и /admin/slips)
+def admin_required(f):
+    @login_required
+    def decorated_function(*args, **kwargs):
+        if current_user.role != 'admin':
             abort(403)
-    wrap.__name__ = f.__name__
-    return wrap
\ No newline at end of file
+        return f(*args, **kwargs)
+    decorated_function.__name__ = f.__name__
+    return decorated_function
@@ -0,0 +1,129 @@
+import hashlib  # Импорт hashlib для вычисления ключа документа по его содержимому
+import json  # Импорт json для стабильной сериализации данных заказа
+import os  # Импорт os для работы с файлами кэша
+import tempfile  # Импорт tempfile для атомарной записи файлов
+import threading  # Импорт threading для блокировки при вытеснении
+import time  # Импорт time для измерения времени генерации
+
+from flask import current_app
+
+from documents import TEMPLATE_VERSION, render_document
+from metrics import DOCUMENT_RENDER_DURATION
+
+# Количество записей в кэш, после которого размер директории пересчитывается заново,
+# чтобы учесть файлы, записанные и удалённые другими процессами
+RESCAN_EVERY = 256
+
+# Доля ограничения, до которой кэш очищается при вытеснении: запас позволяет
+# не просматривать директорию при каждой следующей записи в заполненный кэш
+EVICT_TARGET = 0.9
+
+
+# Функция для атомарной записи документа в директорию кэша (через временный файл).
+# Не использует контекст приложения, поэтому вызывается и в процессах фоновой генерации
+def write_document(directory, key, kind, data):
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, os.path.join(directory, f'{key}.{kind}'))
+
+
+# Класс дискового LRU-кэша сгенерированных документов заказов.
+# Ключ зависит только от содержимого заказа и версии шаблона, поэтому он же служит ETag
+class DocumentCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._total = None  # Оценка размера директории кэша в байтах (None — ещё не подсчитан)
+        self._writes = 0  # Количество записей после последнего подсчёта размера
+
+    # Метод для вычисления ключа документа
+    @staticmethod
+    def key_for(kind, order, order_number):
+        payload = json.dumps(
+            {'template': TEMPLATE_VERSION, 'kind': kind, 'number': order_number, 'order': order},
+            sort_keys=True, ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    # Метод для получения пути к файлу кэша
+    @staticmethod
+    def _path(key, kind):
+        return os.path.join(current_app.config['DOCUMENT_CACHE_DIR'], f'{key}.{kind}')
+
+    # Метод для проверки наличия документа в кэше без чтения файла
+    def contains(self, key, kind):
+        return os.path.exists(self._path(key, kind))
+
+    # Метод для чтения документа из кэша; время изменения файла обновляется для LRU
+    def get(self, key, kind):
+        path = self._path(key, kind)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    # Метод для записи документа в кэш с последующим вытеснением старых файлов
+    def put(self, key, kind, data):
+        directory = current_app.config['DOCUMENT_CACHE_DIR']
+        write_document(directory, key, kind, data)
+        self.account(directory, len(data), current_app.config['DOCUMENT_CACHE_MAX_BYTES'])
+
+    # Метод для учёта записанного файла. Размер директории не пересчитывается при каждой записи:
+    # к оценке прибавляется размер файла, а директория просматривается только при превышении
+    # ограничения, при первой записи и после каждых RESCAN_EVERY записей
+    def account(self, directory, size, max_bytes):
+        with self._lock:
+            self._writes += 1
+            if self._total is not None and self._writes < RESCAN_EVERY:
+                self._total += size
+                if self._total <= max_bytes:
+                    return
+            self._total = self._evict(directory, max_bytes)
+            self._writes = 0
+
+    # Метод для удаления давно не использованных файлов при превышении размера кэша (до EVICT_TARGET
+    # от ограничения); возвращает размер директории после вытеснения. Вызывается под блокировкой
+    @staticmethod
+    def _evict(directory, max_bytes):
+        entries = []
+        total = 0
+        for entry in os.scandir(directory):
+            if not entry.is_file() or entry.name.endswith('.tmp'):
+                continue
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+        if total <= max_bytes:
+            return total
+        entries.sort()
+        target = max_bytes * EVICT_TARGET
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        return total
+
+    # Метод для получения документа из кэша или его генерации и сохранения
+    def get_or_render(self, key, kind, order, order_number):
+        data = self.get(key, kind)
+        if data is None:
+            started = time.perf_counter()
+            data = render_document(kind, order, order_number)
+            DOCUMENT_RENDER_DURATION.observe(time.perf_counter() - started, kind)
+            self.put(key, kind, data)
+        return data
+
+
+# Общий экземпляр кэша документов для процесса
+document_cache = DocumentCache()
@@ -0,0 +1,175 @@
+import copy
+import functools
+import io
+import zipfile
+
+# Библиотеки python-docx и reportlab импортируются внутри функций: большинство
+# рабочих процессов никогда не генерирует документы и не должно тратить на них время и память
+
+# Версия шаблона документов заказа: её нужно увеличить при любом изменении
+# DocxTemplate или PdfTemplate, чтобы сбросить кэш уже сгенерированных файлов
+TEMPLATE_VERSION = 2
+
+# MIME-типы поддерживаемых форматов документов
+MIMETYPES = {
+    'pdf': 'application/pdf',
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+}
+
+# Заголовок документа и поля заказа с подписями в порядке вывода
+TITLE = 'Заказ #'
+DOCUMENT_FIELDS = [
+    ('name', 'Имя получателя: '),
+    ('address', 'Адрес: '),
+    ('flower_type', 'Тип цветов: '),
+    ('message', 'Сообщение: '),
+]
+
+# Часть пакета DOCX с текстом документа — единственная, которая меняется от заказа к заказу
+DOCX_DOCUMENT_PART = 'word/document.xml'
+
+
+# Функция для получения данных заказа, которые попадают в документ
+def order_document_data(order):
+    return {
+        'name': order.name,
+        'address': order.address,
+        'flower_type': order.flower_type,
+        'message': order.message
+    }
+
+
+# Функция для получения значений полей документа в виде строк (пустое поле, например
+# сообщение без текста, выводится пустой строкой)
+def field_values(order, order_number):
+    return {key: '' if value is None else str(value) for key, value in dict(order, number=order_number).items()}
+
+
+# Функция для регистрации шрифта DejaVuSans для поддержки кириллицы (повторный вызов ничего не делает)
+def register_fonts():
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    if 'DejaVuSans' not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont('DejaVuSans', 'DejaVuSans.ttf'))
+
+
+# Класс подготовленного шаблона DOCX. Пакет документа (стили, тема, настройки, сжатые один раз)
+# и разметка текста с пустыми полями создаются при первом использовании; для заказа копируется
+# разметка, заполняются поля и в готовый пакет дописывается только word/document.xml
+class DocxTemplate:
+    def __init__(self):
+        from docx import Document
+        from docx.oxml.ns import qn
+        doc = Document()
+        # Значение каждого поля — отдельный фрагмент текста (run) после подписи; временно в нём имя поля
+        doc.add_heading(TITLE, 0).add_run('number')
+        for key, label in DOCUMENT_FIELDS:
+            doc.add_paragraph(label).add_run(key)
+        self._element = doc.element
+        keys = {'number'} | {key for key, _ in DOCUMENT_FIELDS}
+        # (номер фрагмента текста в документе, поле)
+        self._runs = [(index, run.text) for index, run in enumerate(self._element.iter(qn('w:r'))) if run.text in keys]
+
+        buffer = io.BytesIO()
+        doc.save(buffer)
+        base = io.BytesIO()
+        with zipfile.ZipFile(buffer) as source, zipfile.ZipFile(base, 'w', zipfile.ZIP_DEFLATED) as target:
+            for info in source.infolist():
+                if info.filename != DOCX_DOCUMENT_PART:
+                    target.writestr(info, source.read(info))
+        self._base = base.getvalue()
+
+    # Метод для генерации DOCX заказа в виде байтов
+    def render(self, order, order_number):
+        from docx.opc.oxml import serialize_part_xml
+        from docx.oxml.ns import qn
+        element = copy.deepcopy(self._element)
+        values = field_values(order, order_number)
+        runs = list(element.iter(qn('w:r')))
+        for index, key in self._runs:
+            runs[index].text = values[key]
+
+        buffer = io.BytesIO(self._base)
+        with zipfile.ZipFile(buffer, 'a', zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr(DOCX_DOCUMENT_PART, serialize_part_xml(element))
+        return buffer.getvalue()
+
+
+# Класс подготовленного шаблона PDF. Положение строк и ширина подписей вычисляются один раз,
+# подписи рисуются один раз на документ (form XObject) и используются на каждой странице,
+# поэтому в многостраничном документе шрифт и подписи встраиваются один раз на все заказы
+class PdfTemplate:
+    FONT = 'DejaVuSans'
+    FONT_SIZE = 12
+    LEFT = 100
+    TOP = 750
+    LINE_HEIGHT = 25
+
+    def __init__(self):
+        from reportlab.lib.pagesizes import letter
+        from reportlab.pdfbase.pdfmetrics import stringWidth
+        register_fonts()
+        self.pagesize = letter
+        rows = [('number', TITLE)] + DOCUMENT_FIELDS
+        # (поле, подпись, y, x значения)
+        self._rows = [
+            (key, label, self.TOP - index * self.LINE_HEIGHT, self.LEFT + stringWidth(label, self.FONT, self.FONT_SIZE))
+            for index, (key, label) in enumerate(rows)
+        ]
+
+    # Метод для добавления в документ формы с подписями полей
+    def _draw_labels(self, c):
+        c.beginForm('order_labels')
+        c.setFont(self.FONT, self.FONT_SIZE)
+        for _, label, y, _ in self._rows:
+            c.drawString(self.LEFT, y, label)
+        c.endForm()
+
+    # Метод для генерации многостраничного PDF: по странице на каждую пару (данные заказа, номер)
+    def render_pages(self, orders):
+        from reportlab.pdfgen import canvas
+        buffer = io.BytesIO()
+        c = canvas.Canvas(buffer, pagesize=self.pagesize)
+        self._draw_labels(c)
+        for order, order_number in orders:
+            values = field_values(order, order_number)
+            c.doForm('order_labels')
+            c.setFont(self.FONT, self.FONT_SIZE)
+            for key, _, y, x in self._rows:
+                c.drawString(x, y, values[key])
+            c.showPage()
+        c.save()
+        return buffer.getvalue()
+
+    # Метод для генерации PDF одного заказа в виде байтов
+    def render(self, order, order_number):
+        return self.render_pages([(order, order_number)])
+
+
+# Функция для получения шаблона документа; шаблон готовится один раз на процесс
+@functools.lru_cache(maxsize=None)
+def document_template(kind):
+    return PdfTemplate() if kind == 'pdf' else DocxTemplate()
+
+
+# Функция для подготовки шаблонов заранее (инициализатор процессов фоновой генерации)
+def prepare_templates():
+    for kind in MIMETYPES:
+        document_template(kind)
+
+
+# Функция для генерации документа заказа в виде байтов
+def render_document(kind, order, order_number):
+    return document_template(kind).render(order, order_number)
+
+
+# Функция для генерации отдельных документов нескольких заказов с общим шаблоном.
+# Принимает пары (данные заказа, номер), возвращает список байтов в том же порядке
+def render_documents(kind, orders):
+    template = document_template(kind)
+    return [template.render(order, order_number) for order, order_number in orders]
+
+
+# Функция для генерации одного многостраничного PDF для нескольких заказов (страница на заказ)
+def render_combined_pdf(orders):
+    return document_template('pdf').render_pages(orders)
@@ -0,0 +1,85 @@
+import io  # Импорт io для потока, в который пишется ZIP-архив
+import zipfile  # Импорт zipfile для формирования архива
+from datetime import datetime, time, timedelta  # Импорт datetime для границ суток при печати накладных
+from time import perf_counter  # Импорт perf_counter для измерения времени генерации документов
+
+from sqlalchemy import select
+
+from models import db, Order
+from documents import order_document_data, render_document, render_combined_pdf
+from doc_cache import document_cache
+from metrics import DOCUMENT_RENDER_DURATION
+
+
+# Класс записываемого потока без перемотки: zipfile пишет в него архив,
+# а генератор забирает накопленные байты после каждого файла
+class _ZipStream(io.RawIOBase):
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    # Метод для получения и очистки накопленных байтов
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+# Функция для постраничного чтения заказов через серверный курсор
+def iter_orders(user_id=None, batch_size=200):
+    query = select(Order).order_by(Order.id)
+    if user_id is not None:
+        query = query.where(Order.user_id == user_id)
+    result = db.session.execute(query.execution_options(yield_per=batch_size, stream_results=True))
+    for order in result.scalars():
+        yield order
+
+
+# Функция для чтения заказов, оформленных за указанные сутки (время заказов хранится в UTC)
+def orders_for_day(day):
+    start = datetime.combine(day, time.min)
+    query = select(Order).where(Order.created_at >= start, Order.created_at < start + timedelta(days=1)).order_by(Order.id)
+    return db.session.execute(query).scalars().all()
+
+
+# Функция для генерации накладных курьерам: один многостраничный PDF, страница на заказ.
+# Шрифт и подписи полей встраиваются в файл один раз на все заказы
+def delivery_slips_pdf(orders):
+    started = perf_counter()
+    data = render_combined_pdf([(order_document_data(order), order.number) for order in orders])
+    DOCUMENT_RENDER_DURATION.observe(perf_counter() - started, 'slips')
+    return data
+
+
+# Функция для получения документа заказа: из дискового кэша, если он уже есть, иначе генерация.
+# Сгенерированные при выгрузке файлы в кэш не записываются, чтобы не вытеснять часто скачиваемые документы
+def _order_document(kind, order):
+    order_data = order_document_data(order)
+    key = document_cache.key_for(kind, order_data, order.number)
+    data = document_cache.get(key, kind)
+    if data is None:
+        started = perf_counter()
+        data = render_document(kind, order_data, order.number)
+        DOCUMENT_RENDER_DURATION.observe(perf_counter() - started, 'zip')
+    return data
+
+
+# Функция-генератор ZIP-архива с документами заказов. Каждый файл добавляется
+# в архив сразу после генерации, поэтому объём памяти не зависит от числа заказов
+def stream_orders_archive(orders, kind, by_user=False):
+    stream = _ZipStream()
+    # Документы PDF и DOCX уже сжаты, поэтому повторное сжатие не используется
+    with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for order in orders:
+            name = f'order_{order.number}.{kind}'
+            if by_user:
+                name = f'user_{order.user_id}/{name}'
+            archive.writestr(name, _order_document(kind, order))
+            yield stream.drain()
+    yield stream.drain()
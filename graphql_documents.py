@@ -0,0 +1,289 @@
+import hashlib  # Импорт hashlib для вычисления хэша текста запроса
+import json  # Импорт json для чтения расширений запроса и файла сохранённых запросов
+import os  # Импорт os для проверки времени изменения файла сохранённых запросов
+import threading  # Импорт threading для защиты кэшей
+from collections import OrderedDict  # Импорт OrderedDict для вытеснения давно не использованных документов
+from functools import partial  # Импорт partial для привязки схемы и документа к функции выполнения
+
+from flask import current_app, request
+from flask_graphql import GraphQLView
+from graphql import parse, validate
+from graphql.backend.base import GraphQLBackend, GraphQLDocument
+from graphql.error import GraphQLError
+from graphql.execution import ExecutionResult, execute
+from graphql.language import ast
+from graphql.type.definition import GraphQLList, get_named_type, get_nullable_type
+from graphql_server import HttpQueryError
+
+from schema import MAX_PAGE_SIZE
+from metrics import GRAPHQL_DOCUMENTS
+
+# Аргументы поля, задающие количество возвращаемых элементов списка
+PAGE_ARGUMENTS = ('first', 'last', 'limit')
+
+
+# Функция для вычисления хэша текста запроса (SHA-256, как в протоколе Automatic Persisted Queries)
+def query_hash(query):
+    return hashlib.sha256(query.encode('utf-8')).hexdigest()
+
+
+# Функция для определения количества элементов, которое может вернуть поле: значение аргумента
+# first/last/limit, значение переменной по умолчанию или значение аргумента по умолчанию в схеме.
+# Если значение переменной неизвестно, берётся наибольший размер страницы, а для поля-списка без такого
+# аргумента — list_size. Список edges в Relay-соединении считается одним элементом: размер страницы
+# уже учтён в поле соединения
+def _page_size(parent_type, field_def, node, variables, list_size):
+    for argument in node.arguments:
+        if argument.name.value not in PAGE_ARGUMENTS:
+            continue
+        value = argument.value
+        if isinstance(value, ast.Variable):
+            value = variables.get(value.name.value)
+        if isinstance(value, ast.IntValue):
+            return max(1, min(int(value.value), MAX_PAGE_SIZE))
+        return MAX_PAGE_SIZE
+    for name in PAGE_ARGUMENTS:
+        argument = field_def.args.get(name)
+        if argument is not None and isinstance(argument.default_value, int):
+            return max(1, min(argument.default_value, MAX_PAGE_SIZE))
+    if isinstance(get_nullable_type(field_def.type), GraphQLList):
+        if node.name.value == 'edges' and 'pageInfo' in parent_type.fields:
+            return 1
+        return list_size
+    return 1
+
+
+# Функция для подсчёта глубины и стоимости набора полей. Стоимость поля — единица плюс стоимость
+# вложенных полей, умноженная на количество элементов списка. Неограниченный список в корне операции
+# (например, allOrders) может вернуть всю таблицу и считается полной страницей, а вложенный список
+# (например, заказы пользователя из пакетного загрузчика) — nested_list_size элементами.
+# Служебные поля (__typename, __schema) не учитываются, чтобы интроспекция GraphiQL не упиралась в ограничения
+def _measure(schema, parent_type, selection_set, fragments, variables, depth, nested_list_size):
+    max_depth, cost = depth, 0
+    for selection in selection_set.selections:
+        if isinstance(selection, ast.Field):
+            name = selection.name.value
+            if name.startswith('__'):
+                continue
+            field_def = parent_type.fields[name]
+            child_depth, child_cost = depth + 1, 0
+            if selection.selection_set is not None:
+                child_depth, child_cost = _measure(schema, get_named_type(field_def.type), selection.selection_set,
+                                                   fragments, variables, depth + 1, nested_list_size)
+            max_depth = max(max_depth, child_depth)
+            list_size = nested_list_size if depth else MAX_PAGE_SIZE
+            cost += 1 + _page_size(parent_type, field_def, selection, variables, list_size) * child_cost
+        else:
+            if isinstance(selection, ast.FragmentSpread):
+                fragment = fragments[selection.name.value]
+            else:
+                fragment = selection
+            fragment_type = parent_type
+            if fragment.type_condition is not None:
+                fragment_type = schema.get_type(fragment.type_condition.name.value)
+            child_depth, child_cost = _measure(schema, fragment_type, fragment.selection_set, fragments, variables, depth,
+                                               nested_list_size)
+            max_depth = max(max_depth, child_depth)
+            cost += child_cost
+    return max_depth, cost
+
+
+# Функция для подсчёта наибольших глубины и стоимости операций проверенного документа.
+# nested_list_size — оценка количества элементов вложенного списка без аргумента first/last/limit
+def measure_document(schema, document_ast, nested_list_size=MAX_PAGE_SIZE):
+    fragments = {
+        definition.name.value: definition for definition in document_ast.definitions
+        if isinstance(definition, ast.FragmentDefinition)
+    }
+    roots = {'query': schema.get_query_type(), 'mutation': schema.get_mutation_type(),
+             'subscription': schema.get_subscription_type()}
+    max_depth = max_cost = 0
+    for definition in document_ast.definitions:
+        if not isinstance(definition, ast.OperationDefinition):
+            continue
+        variables = {
+            variable.variable.name.value: variable.default_value for variable in definition.variable_definitions or []
+        }
+        depth, cost = _measure(schema, roots[definition.operation], definition.selection_set, fragments, variables, 0,
+                               nested_list_size)
+        max_depth, max_cost = max(max_depth, depth), max(max_cost, cost)
+    return max_depth, max_cost
+
+
+# Функция для создания документа с заранее известным результатом-ошибкой (документ не кэшируется)
+def _rejected_document(schema, query, document_ast, errors):
+    return GraphQLDocument(schema=schema, document_string=query, document_ast=document_ast,
+                           execute=lambda *args, **kwargs: ExecutionResult(errors=errors, invalid=True))
+
+
+# Класс кэша разобранных и проверенных документов GraphQL (LRU по хэшу текста запроса).
+# Используется как backend GraphQLView: повторный запрос не разбирается и не проверяется заново,
+# а документ выполняется без повторной валидации. Документы с ошибками не кэшируются
+class DocumentCache(GraphQLBackend):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._documents = OrderedDict()  # Хэш запроса -> документ
+
+    # Метод для разбора и проверки запроса с подсчётом глубины и стоимости
+    def _build(self, schema, query):
+        document_ast = parse(query)
+        errors = validate(schema, document_ast)
+        if errors:
+            return _rejected_document(schema, query, document_ast, errors), False
+        document = GraphQLDocument(schema=schema, document_string=query, document_ast=document_ast,
+                                   execute=partial(execute, schema, document_ast))
+        document.depth, document.cost = measure_document(schema, document_ast,
+                                                         current_app.config['GRAPHQL_NESTED_LIST_COST'])
+        return document, True
+
+    # Метод, который graphql-server вызывает для получения документа по тексту запроса
+    def document_from_string(self, schema, request_string):
+        key = query_hash(request_string)
+        with self._lock:
+            document = self._documents.get(key)
+            if document is not None:
+                self._documents.move_to_end(key)
+        if document is not None:
+            GRAPHQL_DOCUMENTS.inc('hit')
+        else:
+            GRAPHQL_DOCUMENTS.inc('miss')
+            document, valid = self._build(schema, request_string)
+            if not valid:
+                return document
+            with self._lock:
+                self._documents[key] = document
+                while len(self._documents) > current_app.config['GRAPHQL_DOCUMENT_CACHE_SIZE']:
+                    self._documents.popitem(last=False)
+
+        # Ограничения проверяются при каждом запросе, чтобы изменение конфигурации действовало на кэшированные документы
+        max_depth = current_app.config['GRAPHQL_MAX_DEPTH']
+        max_cost = current_app.config['GRAPHQL_MAX_COST']
+        if max_depth and document.depth > max_depth:
+            return _rejected_document(schema, request_string, document.document_ast, [GraphQLError(
+                'Глубина запроса {} превышает допустимую {}.'.format(document.depth, max_depth))])
+        if max_cost and document.cost > max_cost:
+            return _rejected_document(schema, request_string, document.document_ast, [GraphQLError(
+                'Стоимость запроса {} превышает допустимую {}.'.format(document.cost, max_cost))])
+        return document
+
+    # Метод для очистки кэша
+    def clear(self):
+        with self._lock:
+            self._documents.clear()
+
+
+# Класс хранилища сохранённых запросов: список разрешённых запросов из файла GRAPHQL_PERSISTED_QUERIES_FILE
+# (хэш -> текст, файл перечитывается после изменения) и запросы, зарегистрированные клиентами
+# по протоколу Automatic Persisted Queries (вытесняются, как и документы, по LRU)
+class PersistedQueries:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._allowlist = {}
+        self._allowlist_mtime = None
+        self._registered = OrderedDict()  # Хэш запроса -> текст запроса
+
+    # Метод для получения списка разрешённых запросов
+    def allowlist(self):
+        path = current_app.config['GRAPHQL_PERSISTED_QUERIES_FILE']
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        with self._lock:
+            if mtime != self._allowlist_mtime:
+                self._allowlist = load_persisted_queries(path)
+                self._allowlist_mtime = mtime
+            return self._allowlist
+
+    # Метод для получения текста запроса по хэшу; в режиме списка разрешённых запросов
+    # зарегистрированные клиентами запросы не используются
+    def get(self, key, allowlist_only):
+        query = self.allowlist().get(key)
+        if query is not None or allowlist_only:
+            return query
+        with self._lock:
+            query = self._registered.get(key)
+            if query is not None:
+                self._registered.move_to_end(key)
+        return query
+
+    # Метод для регистрации запроса, присланного клиентом вместе с хэшем
+    def register(self, key, query):
+        with self._lock:
+            self._registered[key] = query
+            self._registered.move_to_end(key)
+            while len(self._registered) > current_app.config['GRAPHQL_DOCUMENT_CACHE_SIZE']:
+                self._registered.popitem(last=False)
+
+
+# Функция для чтения файла сохранённых запросов; хэш каждого запроса проверяется
+def load_persisted_queries(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            queries = json.load(f)
+    except FileNotFoundError:
+        return {}
+    for key, query in queries.items():
+        if query_hash(query) != key:
+            raise ValueError('Хэш запроса {} в файле {} не совпадает с текстом запроса.'.format(key, path))
+    return queries
+
+
+# Функция для проверки запроса по схеме перед сохранением; возвращает список сообщений об ошибках
+def check_query(schema, query):
+    try:
+        errors = validate(schema, parse(query))
+    except GraphQLError as error:
+        errors = [error]
+    return [error.message for error in errors]
+
+
+# Общие кэш документов и хранилище сохранённых запросов процесса
+graphql_document_cache = DocumentCache()
+persisted_queries = PersistedQueries()
+
+
+# Класс представления GraphQL с поддержкой сохранённых запросов: клиент может прислать
+# вместо текста запроса его хэш в extensions.persistedQuery.sha256Hash (тело запроса или параметры GET).
+# При GRAPHQL_ALLOWLIST_ONLY выполняются только запросы из списка разрешённых
+class PersistedQueryView(GraphQLView):
+    # Метод для подстановки текста сохранённого запроса по хэшу
+    def resolve_query(self, data, fallback):
+        if not isinstance(data, dict):
+            return data
+        params = {name: data.get(name) or fallback.get(name) for name in ('query', 'variables', 'operationName')}
+        extensions = data.get('extensions') or fallback.get('extensions') or {}
+        if isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except ValueError:
+                raise HttpQueryError(400, 'Расширения запроса должны быть в формате JSON.')
+        key = (extensions.get('persistedQuery') or {}).get('sha256Hash')
+        allowlist_only = current_app.config['GRAPHQL_ALLOWLIST_ONLY']
+        query = params['query']
+
+        if key is None:
+            if query and allowlist_only and query_hash(query) not in persisted_queries.allowlist():
+                raise HttpQueryError(403, 'Разрешены только сохранённые запросы.')
+            return params
+        if not query:
+            params['query'] = persisted_queries.get(key, allowlist_only)
+            if params['query'] is None:
+                # Клиенты Automatic Persisted Queries ожидают это сообщение и повторяют запрос с текстом
+                raise HttpQueryError(200, 'PersistedQueryNotFound')
+            return params
+        if query_hash(query) != key:
+            raise HttpQueryError(400, 'Хэш запроса не совпадает с текстом запроса.')
+        if allowlist_only:
+            if key not in persisted_queries.allowlist():
+                raise HttpQueryError(403, 'Разрешены только сохранённые запросы.')
+        else:
+            persisted_queries.register(key, query)
+        return params
+
+    # Метод для разбора тела запроса с подстановкой сохранённых запросов
+    def parse_body(self):
+        data = super().parse_body()
+        if isinstance(data, list):
+            return [self.resolve_query(entry, {}) for entry in data]
+        return self.resolve_query(data, request.args)
@@ -0,0 +1,35 @@
+from collections import defaultdict  # Импорт defaultdict для группировки заказов по пользователям
+
+from flask import g
+from promise import Promise  # Импорт Promise, на котором основано выполнение запросов в graphene 2
+from promise.dataloader import DataLoader  # Импорт DataLoader для пакетной загрузки связанных записей
+
+from models import User, Order
+
+
+# Загрузчик пользователей по id: все ключи, собранные за проход выполнения запроса,
+# загружаются одним запросом WHERE id IN (...)
+class UserLoader(DataLoader):
+    def batch_load_fn(self, user_ids):
+        users = {user.id: user for user in User.query.filter(User.id.in_(user_ids)).all()}
+        return Promise.resolve([users.get(user_id) for user_id in user_ids])
+
+
+# Загрузчик заказов по id пользователя: одним запросом для всех пользователей на странице
+class OrdersByUserLoader(DataLoader):
+    def batch_load_fn(self, user_ids):
+        orders = defaultdict(list)
+        for order in Order.query.filter(Order.user_id.in_(user_ids)).order_by(Order.id).all():
+            orders[order.user_id].append(order)
+        return Promise.resolve([orders[user_id] for user_id in user_ids])
+
+
+# Функция для получения загрузчиков текущего запроса. Загрузчики хранятся в flask.g,
+# поэтому загруженные записи кэшируются только до конца запроса
+def get_loaders():
+    if 'loaders' not in g:
+        g.loaders = {
+            'user': UserLoader(),
+            'orders_by_user': OrdersByUserLoader(),
+        }
+    return g.loaders
@@ -0,0 +1,240 @@
+import bisect  # Импорт bisect для поиска корзины гистограммы
+import functools  # Импорт functools для распознавания стандартных резолверов graphene
+import logging  # Импорт logging для журнала медленных запросов
+import threading  # Импорт threading для защиты счётчиков
+import time  # Импорт time для измерения длительности
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+# Журнал медленных SQL-запросов
+slow_query_log = logging.getLogger('flowers.slow_query')
+
+# Границы корзин гистограмм: длительность в секундах и количество запросов к базе данных
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+
+# Функция для экранирования значения метки в текстовом формате Prometheus
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Функция для форматирования набора меток
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(name, _escape(value)) for name, value in pairs) + '}'
+
+
+# Функция для форматирования числа без лишних нулей
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# Класс счётчика с метками
+class Counter:
+    def __init__(self, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}  # Значения меток -> счётчик
+
+    # Метод для увеличения счётчика
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    # Метод для вывода счётчика в текстовом формате Prometheus
+    def render(self):
+        lines = ['# HELP {} {}'.format(self.name, self.description), '# TYPE {} counter'.format(self.name)]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append('{}{} {}'.format(self.name, _format_labels(self.labels, label_values), _format_value(value)))
+        return lines
+
+
+# Класс гистограммы с метками и фиксированными границами корзин
+class Histogram:
+    def __init__(self, name, description, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._values = {}  # Значения меток -> [счётчики корзин, сумма, количество]
+
+    # Метод для учёта одного наблюдения
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    # Метод для вывода гистограммы в текстовом формате Prometheus (корзины накопительные)
+    def render(self):
+        lines = ['# HELP {} {}'.format(self.name, self.description), '# TYPE {} histogram'.format(self.name)]
+        with self._lock:
+            for label_values, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float('inf'),), counts + [None]):
+                    cumulative = count if bucket_count is None else cumulative + bucket_count
+                    labels = _format_labels(self.labels, label_values, [('le', _format_value(bound))])
+                    lines.append('{}_bucket{} {}'.format(self.name, labels, cumulative))
+                labels = _format_labels(self.labels, label_values)
+                lines.append('{}_sum{} {}'.format(self.name, labels, _format_value(total)))
+                lines.append('{}_count{} {}'.format(self.name, labels, count))
+        return lines
+
+
+# Метрики процесса. При запуске нескольких рабочих процессов каждый из них отдаёт свои значения
+REQUEST_DURATION = Histogram('flowers_http_request_duration_seconds', 'Время обработки HTTP-запроса.',
+                             ['endpoint', 'method', 'status'])
+REQUEST_QUERIES = Histogram('flowers_http_request_db_queries', 'Количество SQL-запросов на один HTTP-запрос.',
+                            ['endpoint'], QUERY_COUNT_BUCKETS)
+QUERY_DURATION = Histogram('flowers_db_query_duration_seconds', 'Время выполнения SQL-запроса.',
+                           ['operation'], QUERY_LATENCY_BUCKETS)
+SLOW_QUERIES = Counter('flowers_db_slow_queries_total', 'Количество SQL-запросов дольше SLOW_QUERY_THRESHOLD_MS.',
+                       ['operation'])
+GRAPHQL_DOCUMENTS = Counter('flowers_graphql_document_cache_total',
+                            'Обращения к кэшу разобранных документов GraphQL (hit — найден в кэше, miss — разобран заново).',
+                            ['result'])
+RESOLVER_DURATION = Histogram('flowers_graphql_resolver_duration_seconds', 'Время работы резолвера GraphQL.',
+                              ['field'])
+DOCUMENT_RENDER_DURATION = Histogram('flowers_document_render_duration_seconds',
+                                     'Время генерации документа заказа в процессе обработки запроса '
+                                     '(pdf, docx — скачивание, zip — документ для ZIP-выгрузки, slips — накладные за день).',
+                                     ['kind'])
+DOCUMENT_JOB_DURATION = Histogram('flowers_document_job_duration_seconds',
+                                  'Время фоновой задачи генерации документа от постановки в очередь до готовности.', ['kind'])
+ORDER_BATCH_SIZE = Histogram('flowers_order_batch_size', 'Количество заказов в одной транзакции группового commit.',
+                             buckets=BATCH_SIZE_BUCKETS)
+ORDER_BATCH_WAIT = Histogram('flowers_order_batch_wait_seconds',
+                             'Время от постановки заказа в очередь группового commit до подтверждения.')
+
+METRICS = [REQUEST_DURATION, REQUEST_QUERIES, QUERY_DURATION, SLOW_QUERIES, GRAPHQL_DOCUMENTS, RESOLVER_DURATION,
+           DOCUMENT_RENDER_DURATION, DOCUMENT_JOB_DURATION, ORDER_BATCH_SIZE, ORDER_BATCH_WAIT]
+
+
+# Функция для вывода всех метрик в текстовом формате Prometheus
+def render_metrics():
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+# Функция для определения вида SQL-запроса (SELECT, INSERT, UPDATE, DELETE или OTHER)
+def _operation(statement):
+    keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ''
+    return keyword if keyword in ('SELECT', 'INSERT', 'UPDATE', 'DELETE') else 'OTHER'
+
+
+# Обработчик начала SQL-запроса: время начала сохраняется в соединении (запросы могут быть вложенными)
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+# Обработчик ошибки SQL-запроса: время начала удаляется, чтобы не нарушить учёт следующих запросов
+def _handle_error(context):
+    if context.connection is not None and context.connection.info.get('query_started'):
+        context.connection.info['query_started'].pop()
+
+
+# Функция для создания обработчика завершения SQL-запроса: учёт длительности,
+# счётчиков текущего HTTP-запроса и запись в журнал медленных запросов
+def _after_cursor_execute_factory(threshold):
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info['query_started'].pop()
+        operation = _operation(statement)
+        QUERY_DURATION.observe(duration, operation)
+        endpoint = None
+        if has_request_context():
+            g.db_queries = g.get('db_queries', 0) + 1
+            g.db_time = g.get('db_time', 0.0) + duration
+            endpoint = request.endpoint
+        if duration >= threshold:
+            SLOW_QUERIES.inc(operation)
+            slow_query_log.warning('Медленный запрос %.1f мс (%s): %s', duration * 1000, endpoint, ' '.join(statement.split())[:1000])
+    return after_cursor_execute
+
+
+# Функция для начала измерения HTTP-запроса
+def _start_request():
+    g.request_started = time.perf_counter()
+    g.db_queries = 0
+    g.db_time = 0.0
+
+
+# Функция для учёта HTTP-запроса и добавления заголовка Server-Timing
+def _finish_request(response):
+    started = g.get('request_started')
+    if started is None:
+        return response
+    duration = time.perf_counter() - started
+    endpoint = request.endpoint or 'unknown'
+    REQUEST_DURATION.observe(duration, endpoint, request.method, response.status_code)
+    REQUEST_QUERIES.observe(g.db_queries, endpoint)
+    response.headers['Server-Timing'] = 'db;dur={:.1f};desc="{} queries", app;dur={:.1f}'.format(
+        g.db_time * 1000, g.db_queries, duration * 1000)
+    return response
+
+
+# Функция для подключения измерений к приложению: обработчики SQL-запросов на всех движках
+# и обработчики начала и завершения HTTP-запросов. Вызывается в фабрике после init_database
+def init_metrics(app, db):
+    if not app.config['METRICS_ENABLED']:
+        return
+    threshold = app.config['SLOW_QUERY_THRESHOLD_MS'] / 1000
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', _after_cursor_execute_factory(threshold))
+            event.listen(engine, 'handle_error', _handle_error)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+
+
+# Класс middleware GraphQL для измерения времени резолверов схемы.
+# Стандартные резолверы graphene (чтение атрибута объекта) не измеряются: их много, и они ничего не стоят.
+# Если резолвер вернул promise (пакетный загрузчик), время считается до его выполнения
+class ResolverTimingMiddleware:
+    def __init__(self):
+        self._custom = {}  # (тип, поле) -> есть ли у поля собственный резолвер
+
+    # Метод для проверки, что у поля есть собственный резолвер
+    def _is_custom(self, info):
+        key = (info.parent_type.name, info.field_name)
+        custom = self._custom.get(key)
+        if custom is None:
+            resolver = info.parent_type.fields[info.field_name].resolver
+            custom = self._custom[key] = not isinstance(resolver, functools.partial)
+        return custom
+
+    # Метод, который graphql-core вызывает для каждого поля
+    def resolve(self, next, root, info, **args):
+        if not current_app.config['METRICS_ENABLED'] or not self._is_custom(info):
+            return next(root, info, **args)
+        field = '{}.{}'.format(info.parent_type.name, info.field_name)
+        started = time.perf_counter()
+        result = next(root, info, **args)
+
+        # Функция для учёта времени после выполнения promise
+        def observe(value):
+            RESOLVER_DURATION.observe(time.perf_counter() - started, field)
+            return value
+
+        if hasattr(result, 'then'):
+            return result.then(observe)
+        return observe(result)
@@ -0,0 +1,30 @@
+"""Add catalog version counter
+
+Revision ID: 3f7a9c2d1e04
+Revises: b1c2e11591d9
+Create Date: 2026-10-18 10:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f7a9c2d1e04'
+down_revision = 'b1c2e11591d9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'catalog_version',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("INSERT INTO catalog_version (id, version) VALUES (1, 1)")
+
+
+def downgrade():
+    op.drop_table('catalog_version')
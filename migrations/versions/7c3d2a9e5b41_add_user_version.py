@@ -0,0 +1,30 @@
+"""Add user version counter
+
+Revision ID: 7c3d2a9e5b41
+Revises: f41c8e0a6d25
+Create Date: 2026-10-18 16:40:12.508317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c3d2a9e5b41'
+down_revision = 'f41c8e0a6d25'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'user_version',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("INSERT INTO user_version (id, version) VALUES (1, 1)")
+
+
+def downgrade():
+    op.drop_table('user_version')
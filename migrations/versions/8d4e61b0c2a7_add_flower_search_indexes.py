@@ -0,0 +1,66 @@
+"""Add flower search indexes
+
+Revision ID: 8d4e61b0c2a7
+Revises: 3f7a9c2d1e04
+Create Date: 2026-10-18 11:02:17.540913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d4e61b0c2a7'
+down_revision = '3f7a9c2d1e04'
+branch_labels = None
+depends_on = None
+
+
+def normalize_name(value):
+    return (value or '').casefold().replace('ё', 'е').strip()
+
+
+def upgrade():
+    op.add_column('flower', sa.Column('search_name', sa.String(length=100), nullable=False, server_default=''))
+    op.create_index('ix_flower_length', 'flower', ['length'])
+    op.create_index('ix_flower_price', 'flower', ['price'])
+
+    # Backfill normalized names in Python: SQLite lower() does not fold Cyrillic
+    bind = op.get_bind()
+    flower = sa.table('flower', sa.column('id', sa.Integer), sa.column('name', sa.String), sa.column('search_name', sa.String))
+    for flower_id, name in bind.execute(sa.select(flower.c.id, flower.c.name)).all():
+        bind.execute(flower.update().where(flower.c.id == flower_id).values(search_name=normalize_name(name)))
+
+    if bind.dialect.name == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE flower_fts USING fts5("
+            "search_name, content='flower', content_rowid='id', tokenize='trigram')"
+        )
+        op.execute(
+            "CREATE TRIGGER flower_fts_ai AFTER INSERT ON flower BEGIN "
+            "INSERT INTO flower_fts(rowid, search_name) VALUES (new.id, new.search_name); END"
+        )
+        op.execute(
+            "CREATE TRIGGER flower_fts_ad AFTER DELETE ON flower BEGIN "
+            "INSERT INTO flower_fts(flower_fts, rowid, search_name) VALUES ('delete', old.id, old.search_name); END"
+        )
+        op.execute(
+            "CREATE TRIGGER flower_fts_au AFTER UPDATE ON flower BEGIN "
+            "INSERT INTO flower_fts(flower_fts, rowid, search_name) VALUES ('delete', old.id, old.search_name); "
+            "INSERT INTO flower_fts(rowid, search_name) VALUES (new.id, new.search_name); END"
+        )
+        op.execute("INSERT INTO flower_fts(flower_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS flower_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS flower_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS flower_fts_ai")
+        op.execute("DROP TABLE IF EXISTS flower_fts")
+
+    op.drop_index('ix_flower_price', table_name='flower')
+    op.drop_index('ix_flower_length', table_name='flower')
+    with op.batch_alter_table('flower') as batch_op:
+        batch_op.drop_column('search_name')
@@ -0,0 +1,53 @@
+"""Add per-user order number
+
+Revision ID: c5a2f9e7b318
+Revises: 8d4e61b0c2a7
+Create Date: 2026-10-18 11:47:05.126734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5a2f9e7b318'
+down_revision = '8d4e61b0c2a7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('user', sa.Column('last_order_number', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('order', sa.Column('number', sa.Integer(), nullable=True))
+    op.create_index('ix_order_user_id_id', 'order', ['user_id', 'id'])
+
+    # Backfill: the number of an order is its position among the user's orders by id
+    user = sa.table('user', sa.column('id', sa.Integer), sa.column('last_order_number', sa.Integer))
+    order = sa.table('order', sa.column('id', sa.Integer), sa.column('user_id', sa.Integer), sa.column('number', sa.Integer))
+    earlier = order.alias('earlier')
+    op.execute(
+        order.update().values(
+            number=sa.select(sa.func.count())
+            .where(earlier.c.user_id == order.c.user_id, earlier.c.id <= order.c.id)
+            .scalar_subquery()
+        )
+    )
+    op.execute(
+        user.update().values(
+            last_order_number=sa.select(sa.func.coalesce(sa.func.max(order.c.number), 0))
+            .where(order.c.user_id == user.c.id)
+            .scalar_subquery()
+        )
+    )
+
+    op.create_index('uq_order_user_id_number', 'order', ['user_id', 'number'], unique=True)
+
+
+def downgrade():
+    op.drop_index('uq_order_user_id_number', table_name='order')
+    op.drop_index('ix_order_user_id_id', table_name='order')
+    with op.batch_alter_table('order') as batch_op:
+        batch_op.drop_column('number')
+
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_column('last_order_number')
@@ -0,0 +1,70 @@
+"""Add order items
+
+Revision ID: e2b7d4a91f60
+Revises: c5a2f9e7b318
+Create Date: 2026-10-18 13:21:56.904417
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b7d4a91f60'
+down_revision = 'c5a2f9e7b318'
+branch_labels = None
+depends_on = None
+
+
+# Legacy Order.flower_type strings look like "Роза (3 шт.),Тюльпан (5 шт.)"
+LEGACY_ITEM = re.compile(r'\s*([^,]+?) \((\d*) шт\.\)')
+
+
+def upgrade():
+    order_item = op.create_table(
+        'order_item',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('order_id', sa.Integer(), nullable=False),
+        sa.Column('flower_id', sa.Integer(), nullable=True),
+        sa.Column('flower_name', sa.String(length=100), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('price', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['order_id'], ['order.id']),
+        sa.ForeignKeyConstraint(['flower_id'], ['flower.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_order_item_order_id', 'order_item', ['order_id'])
+    op.create_index('ix_order_item_flower_id', 'order_item', ['flower_id'])
+
+    # Backfill items from the legacy strings. Legacy orders did not record prices,
+    # so the current catalog price is used as the best available snapshot
+    bind = op.get_bind()
+    flower = sa.table('flower', sa.column('id', sa.Integer), sa.column('name', sa.String), sa.column('price', sa.Float))
+    order = sa.table('order', sa.column('id', sa.Integer), sa.column('flower_type', sa.String))
+    flowers = {name: (flower_id, price) for flower_id, name, price in bind.execute(sa.select(flower.c.id, flower.c.name, flower.c.price))}
+
+    rows = []
+    for order_id, flower_type in bind.execute(sa.select(order.c.id, order.c.flower_type).order_by(order.c.id)):
+        for match in LEGACY_ITEM.finditer(flower_type or ''):
+            name, quantity = match.group(1).strip(), match.group(2)
+            flower_id, price = flowers.get(name, (None, 0))
+            rows.append({
+                'order_id': order_id,
+                'flower_id': flower_id,
+                'flower_name': name,
+                'quantity': int(quantity or 0),
+                'price': price
+            })
+        if len(rows) >= 1000:
+            op.bulk_insert(order_item, rows)
+            rows = []
+    if rows:
+        op.bulk_insert(order_item, rows)
+
+
+def downgrade():
+    op.drop_index('ix_order_item_flower_id', table_name='order_item')
+    op.drop_index('ix_order_item_order_id', table_name='order_item')
+    op.drop_table('order_item')
@@ -0,0 +1,59 @@
+"""Add order timestamps and sales rollups
+
+Revision ID: f41c8e0a6d25
+Revises: e2b7d4a91f60
+Create Date: 2026-10-18 14:05:32.771049
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f41c8e0a6d25'
+down_revision = 'e2b7d4a91f60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Legacy orders have no creation time; they count towards the per-flower and
+    # per-user rollups but not the daily one. Run `flask rebuild_rollups` afterwards
+    op.add_column('order', sa.Column('created_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_order_created_at', 'order', ['created_at'])
+
+    op.create_table(
+        'sales_daily',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('orders_count', sa.Integer(), nullable=False),
+        sa.Column('items_count', sa.Integer(), nullable=False),
+        sa.Column('revenue', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('day')
+    )
+    op.create_table(
+        'sales_by_flower',
+        sa.Column('flower_name', sa.String(length=100), nullable=False),
+        sa.Column('flower_id', sa.Integer(), nullable=True),
+        sa.Column('orders_count', sa.Integer(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('revenue', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('flower_name')
+    )
+    op.create_table(
+        'sales_by_user',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('orders_count', sa.Integer(), nullable=False),
+        sa.Column('items_count', sa.Integer(), nullable=False),
+        sa.Column('revenue', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade():
+    op.drop_table('sales_by_user')
+    op.drop_table('sales_by_flower')
+    op.drop_table('sales_daily')
+    op.drop_index('ix_order_created_at', table_name='order')
+    with op.batch_alter_table('order') as batch_op:
+        batch_op.drop_column('created_at')
@@ -1,9 +1,12 @@
+from datetime import datetime  # Импорт datetime для отметки времени создания заказа
 from flask_sqlalchemy import SQLAlchemy  # Импорт SQLAlchemy для работы с базой данных
 from flask_bcrypt import Bcrypt  # Импорт Bcrypt для хэширования паролей
 from flask_login import UserMixin, LoginManager  # Импорт UserMixin и LoginManager для управления пользователями
+from sqlalchemy.orm import validates  # Импорт validates для поддержания нормализованного названия цветка
+from database import RoutingSession  # Импорт сессии с маршрутизацией чтения на реплику
 
 # Инициализация SQLAlchemy, Bcrypt и LoginManager
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 bcrypt = Bcrypt()
 login_manager = LoginManager()
 
@@ -14,6 +17,7 @@ class User(db.Model, UserMixin):
     email = db.Column(db.String(120), unique=True, nullable=False)  # Email пользователя
     password = db.Column(db.String(60), nullable=False)  # Хэшированный пароль пользователя
     role = db.Column(db.String(10), nullable=False, default='user')  # Роль пользователя, по умолчанию 'user'
+    last_order_number = db.Column(db.Integer, nullable=False, default=0)  # Порядковый номер последнего заказа пользователя
     orders = db.relationship('Order', backref='user', lazy=True)  # Связь с моделью Order
 
     # Метод для представления объекта User в виде строки
@@ -28,24 +32,98 @@ class Order(db.Model):
     flower_type = db.Column(db.String(100), nullable=False)  # Тип цветов в заказе
     message = db.Column(db.String(500), nullable=True)  # Сообщение к заказу
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)  # Внешний ключ для связи с моделью User
+    number = db.Column(db.Integer)  # Порядковый номер заказа у пользователя
+    created_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow, index=True)  # Время создания заказа (UTC)
+    items = db.relationship('OrderItem', backref='order', lazy=True)  # Связь с позициями заказа
+
+    # Составной индекс для выборки заказов пользователя и уникальность номера заказа в пределах пользователя
+    __table_args__ = (
+        db.Index('ix_order_user_id_id', 'user_id', 'id'),
+        db.Index('uq_order_user_id_number', 'user_id', 'number', unique=True),
+    )
 
     # Метод для представления объекта Order в виде строки
     def __repr__(self):
         return f'<Order {self.id}>'
 
+# Функция для нормализации названия цветка для поиска: приведение регистра
+# (в том числе для кириллицы) и замена "ё" на "е"
+def normalize_name(value):
+    return (value or '').casefold().replace('ё', 'е').strip()
+
+# Модель позиции заказа: цветок, количество и цена на момент заказа
+class OrderItem(db.Model):
+    id = db.Column(db.Integer, primary_key=True)  # Первичный ключ
+    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False, index=True)  # Внешний ключ для связи с моделью Order
+    flower_id = db.Column(db.Integer, db.ForeignKey('flower.id', ondelete='SET NULL'), nullable=True, index=True)  # Внешний ключ для связи с моделью Flower
+    flower_name = db.Column(db.String(100), nullable=False)  # Название цветка на момент заказа
+    quantity = db.Column(db.Integer, nullable=False)  # Количество цветов
+    price = db.Column(db.Float, nullable=False)  # Цена одного цветка на момент заказа
+
+    # Метод для представления объекта OrderItem в виде строки
+    def __repr__(self):
+        return f'<OrderItem {self.flower_name} x{self.quantity}>'
+
+# Модель сводки продаж по дням (обновляется вместе с созданием заказа)
+class SalesDaily(db.Model):
+    day = db.Column(db.Date, primary_key=True)  # День (UTC)
+    orders_count = db.Column(db.Integer, nullable=False, default=0)  # Количество заказов
+    items_count = db.Column(db.Integer, nullable=False, default=0)  # Количество проданных цветов
+    revenue = db.Column(db.Float, nullable=False, default=0)  # Выручка
+
+# Модель сводки продаж по цветам (ключ — название цветка на момент заказа)
+class SalesByFlower(db.Model):
+    flower_name = db.Column(db.String(100), primary_key=True)  # Название цветка
+    flower_id = db.Column(db.Integer, nullable=True)  # Идентификатор цветка
+    orders_count = db.Column(db.Integer, nullable=False, default=0)  # Количество заказов с этим цветком
+    quantity = db.Column(db.Integer, nullable=False, default=0)  # Количество проданных цветов
+    revenue = db.Column(db.Float, nullable=False, default=0)  # Выручка
+
+# Модель сводки продаж по пользователям
+class SalesByUser(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)  # Идентификатор пользователя
+    orders_count = db.Column(db.Integer, nullable=False, default=0)  # Количество заказов
+    items_count = db.Column(db.Integer, nullable=False, default=0)  # Количество купленных цветов
+    revenue = db.Column(db.Float, nullable=False, default=0)  # Сумма заказов
+
 # Модель цветов
 class Flower(db.Model):
     id = db.Column(db.Integer, primary_key=True)  # Первичный ключ
     name = db.Column(db.String(100), nullable=False)  # Название цветка
+    search_name = db.Column(db.String(100), nullable=False, default='')  # Нормализованное название для поиска
     image_url = db.Column(db.String(200), nullable=False)  # URL изображения цветка
-    length = db.Column(db.Float, nullable=False)  # Длина цветка
-    price = db.Column(db.Float, nullable=False)  # Цена цветка
+    length = db.Column(db.Float, nullable=False, index=True)  # Длина цветка
+    price = db.Column(db.Float, nullable=False, index=True)  # Цена цветка
+
+    # Метод для обновления нормализованного названия при изменении названия
+    @validates('name')
+    def validate_name(self, key, value):
+        self.search_name = normalize_name(value)
+        return value
 
     # Метод для представления объекта Flower в виде строки
     def __repr__(self):
         return f'<Flower {self.name}>'
 
-# Функция для загрузки пользователя по ID, необходимая для Flask-Login
-@login_manager.user_loader
-def load_user(user_id):
-    return User.query.get(int(user_id))
\ No newline at end of file
+# Модель версии каталога: счётчик увеличивается при каждом изменении цветов,
+# чтобы все рабочие процессы могли сбросить свой кэш каталога
+class CatalogVersion(db.Model):
+    id = db.Column(db.Integer, primary_key=True)  # Первичный ключ (в таблице всегда одна строка)
+    version = db.Column(db.Integer, nullable=False, default=0)  # Текущая версия каталога
+
+    # Метод для представления объекта CatalogVersion в виде строки
+    def __repr__(self):
+        return f'<CatalogVersion {self.version}>'
+
+# Модель версии пользователей: счётчик увеличивается при изменении имени, email или роли
+# и при удалении пользователя, чтобы все рабочие процессы могли сбросить свой кэш пользователей
+class UserVersion(db.Model):
+    id = db.Column(db.Integer, primary_key=True)  # Первичный ключ (в таблице всегда одна строка)
+    version = db.Column(db.Integer, nullable=False, default=0)  # Текущая версия пользователей
+
+    # Метод для представления объекта UserVersion в виде строки
+    def __repr__(self):
+        return f'<UserVersion {self.version}>'
+
+# Функция для загрузки пользователя по ID, необходимая для Flask-Login, находится в user_cache.py:
+# вместо ORM-объекта она возвращает кэшированный снимок пользователя
\ No newline at end of file
@@ -0,0 +1,138 @@
+import queue  # Импорт queue для очереди заказов, ожидающих записи
+import threading  # Импорт threading для фонового потока записи
+import time  # Импорт time для окна сбора пакета и измерения ожидания
+from collections import namedtuple  # Импорт namedtuple для описания заказа в очереди
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError  # Импорт Future для ожидания результата пакета
+
+from flask import current_app
+
+from models import db
+from orders import add_order, create_order
+from metrics import ORDER_BATCH_SIZE, ORDER_BATCH_WAIT
+
+# Заказ в очереди: параметры заказа, future для результата и время постановки в очередь
+PendingOrder = namedtuple('PendingOrder', ['user_id', 'name', 'address', 'message', 'quantities', 'future', 'queued_at'])
+
+
+# Исключение, которое означает, что заказ не был подтверждён за ORDER_BATCH_TIMEOUT секунд.
+# Заказ при этом мог быть записан позже, поэтому пользователю нужно проверить профиль
+class OrderBatchTimeout(Exception):
+    pass
+
+
+# Класс группового коммита заказов. Заказы, поступившие одновременно, записываются одним фоновым
+# потоком в общей транзакции: одна блокировка записи и один fsync на пакет вместо одного на заказ.
+# Каждый заказ выполняется в своей точке сохранения (SAVEPOINT), поэтому ошибка в одном заказе
+# не отменяет остальные, а отправитель получает результат только после commit.
+# Экземпляр создаётся на каждое приложение, поэтому заказы пишутся в базу данных своего приложения
+class OrderBatcher:
+    def __init__(self, app):
+        self._app = app
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = None
+
+    # Метод для ленивого запуска фонового потока записи
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, args=(self._app,), name='order-batcher', daemon=True)
+                self._thread.start()
+
+    # Метод для постановки заказа в очередь и ожидания результата. Возвращает идентификатор заказа;
+    # ошибка заказа (например, ValueError для пустого заказа) выбрасывается в вызывающем потоке
+    def submit(self, user_id, name, address, message, quantities):
+        self._ensure_thread()
+        future = Future()
+        self._queue.put(PendingOrder(user_id, name, address, message, quantities, future, time.perf_counter()))
+        try:
+            return future.result(timeout=current_app.config['ORDER_BATCH_TIMEOUT'])
+        except FutureTimeoutError:
+            raise OrderBatchTimeout()
+
+    # Метод для сбора пакета: первый заказ ожидается без ограничения, остальные —
+    # до заполнения пакета или окончания окна ORDER_BATCH_MAX_WAIT_MS
+    def _collect(self, max_size, max_wait):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + max_wait
+        while len(batch) < max_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    # Метод фонового потока: сбор и запись пакетов до завершения процесса
+    def _run(self, app):
+        while True:
+            with app.app_context():
+                batch = self._collect(app.config['ORDER_BATCH_MAX_SIZE'], app.config['ORDER_BATCH_MAX_WAIT_MS'] / 1000)
+                try:
+                    self._write(batch)
+                except Exception as error:
+                    for pending in batch:
+                        if not pending.future.done():
+                            pending.future.set_exception(error)
+                finally:
+                    db.session.remove()
+
+    # Метод для записи пакета в одной транзакции с точкой сохранения на каждый заказ.
+    # В SQLite транзакция начинается с BEGIN IMMEDIATE: блокировка записи берётся сразу
+    # (с ожиданием busy_timeout), а точки сохранения работают внутри настоящей транзакции
+    def _write(self, batch):
+        ORDER_BATCH_SIZE.observe(len(batch))
+        connection = db.session.connection()
+        if connection.dialect.name == 'sqlite':
+            connection.exec_driver_sql('BEGIN IMMEDIATE')
+
+        written = []
+        for pending in batch:
+            try:
+                with db.session.begin_nested():
+                    order = add_order(pending.user_id, pending.name, pending.address, pending.message, pending.quantities)
+                written.append((pending, order.id))
+            except Exception as error:
+                self._finish(pending, error=error)
+
+        try:
+            db.session.commit()
+        except Exception:
+            # Если не удался commit всего пакета, заказы записываются по одному,
+            # чтобы ошибку получили только те, чей заказ действительно не сохранён
+            db.session.rollback()
+            for pending, _ in written:
+                try:
+                    order = create_order(pending.user_id, pending.name, pending.address, pending.message, pending.quantities)
+                    self._finish(pending, result=order.id)
+                except Exception as error:
+                    db.session.rollback()
+                    self._finish(pending, error=error)
+            return
+
+        for pending, order_id in written:
+            self._finish(pending, result=order_id)
+
+    # Метод для передачи результата отправителю заказа и учёта времени ожидания
+    @staticmethod
+    def _finish(pending, result=None, error=None):
+        ORDER_BATCH_WAIT.observe(time.perf_counter() - pending.queued_at)
+        if error is not None:
+            pending.future.set_exception(error)
+        else:
+            pending.future.set_result(result)
+
+
+# Функция для подключения группового коммита заказов к приложению (app.extensions['order_batcher'])
+def init_order_batcher(app):
+    app.extensions['order_batcher'] = OrderBatcher(app)
+
+
+# Функция для оформления заказа в режиме ORDER_INGEST_MODE: 'direct' — отдельная транзакция,
+# 'batch' — общая транзакция с другими заказами, поступившими одновременно. Возвращает идентификатор заказа
+def submit_order(user_id, name, address, message, quantities):
+    if current_app.config['ORDER_INGEST_MODE'] == 'batch':
+        return current_app.extensions['order_batcher'].submit(user_id, name, address, message, quantities)
+    return create_order(user_id, name, address, message, quantities).id
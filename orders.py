@@ -0,0 +1,75 @@
+from datetime import datetime  # Импорт datetime для отметки времени создания заказа
+
+from sqlalchemy import insert, select, update  # Импорт конструкций SQLAlchemy для атомарного обновления счётчика и пакетной вставки
+
+from models import db, User, Order, OrderItem, Flower
+from analytics import record_order
+
+
+# Функция для получения следующего порядкового номера заказа пользователя.
+# Счётчик увеличивается одним UPDATE в текущей транзакции, поэтому два
+# одновременных заказа одного пользователя не получат одинаковый номер
+def next_order_number(user_id):
+    db.session.execute(
+        update(User).where(User.id == user_id).values(last_order_number=User.last_order_number + 1)
+    )
+    return db.session.execute(select(User.last_order_number).where(User.id == user_id)).scalar_one()
+
+
+# Функция для формирования строки состава заказа вида "Роза (3 шт.),Тюльпан (5 шт.)"
+def format_flower_type(items):
+    return ','.join(f"{item['flower_name']} ({item['quantity']} шт.)" for item in items)
+
+
+# Функция для построения позиций заказа по списку пар (название цветка, количество).
+# Цены берутся одним запросом и сохраняются в позиции. Если какого-то цветка нет в каталоге
+# (например, его удалили или переименовали после загрузки страницы), выбрасывается ValueError
+# со списком неизвестных цветов, чтобы пользователь не получил заказ без части цветов
+def build_order_items(quantities):
+    names = [flower_name for flower_name, _ in quantities]
+    flowers = {
+        name: (flower_id, price)
+        for flower_id, name, price in db.session.execute(
+            select(Flower.id, Flower.name, Flower.price).where(Flower.name.in_(names))
+        )
+    }
+    missing = [flower_name for flower_name, _ in quantities if flower_name not in flowers]
+    if missing:
+        raise ValueError('Неизвестные цветы: {}.'.format(', '.join(missing)))
+    items = []
+    for flower_name, quantity in quantities:
+        flower_id, price = flowers[flower_name]
+        items.append({'flower_id': flower_id, 'flower_name': flower_name, 'quantity': quantity, 'price': price})
+    return items
+
+
+# Функция для добавления заказа в текущую транзакцию без commit: присваивает порядковый номер
+# и записывает позиции заказа одним пакетным INSERT, строка flower_type формируется из них,
+# сводки продаж обновляются в той же транзакции
+def add_order(user_id, name, address, message, quantities):
+    items = build_order_items(quantities)
+    if not items:
+        raise ValueError('Заказ не содержит ни одного цветка.')
+
+    order = Order(
+        name=name,
+        address=address,
+        flower_type=format_flower_type(items),
+        message=message,
+        user_id=user_id,
+        number=next_order_number(user_id),
+        created_at=datetime.utcnow()
+    )
+    db.session.add(order)
+    db.session.flush()
+    db.session.execute(insert(OrderItem), [dict(item, order_id=order.id) for item in items])
+    record_order(order, items)
+    return order
+
+
+# Функция для создания заказа в отдельной транзакции
+def create_order(user_id, name, address, message, quantities):
+    order = add_order(user_id, name, address, message, quantities)
+    db.session.commit()
+    return order
+
@@ -0,0 +1,75 @@
+import hashlib  # Импорт hashlib для вычисления ETag страницы
+import threading  # Импорт threading для защиты кэша
+from collections import OrderedDict  # Импорт OrderedDict для вытеснения давно не использованных фрагментов
+from datetime import datetime, timezone  # Импорт datetime для заголовка Last-Modified
+
+from flask import current_app
+
+from catalog import catalog_cache, get_catalog_version
+from assets import asset_manifest
+
+# Версия шаблонов каталога: её нужно увеличить при любом изменении index.html или flower_grid.html,
+# чтобы браузеры не получали ответ 304 для страницы, сохранённой со старой разметкой
+PAGE_TEMPLATE_VERSION = 2
+
+
+# Функция для получения текущей версии каталога: из кэша каталога, если он включён, иначе из базы данных
+def current_catalog_version():
+    if current_app.config['CATALOG_CACHE_ENABLED']:
+        return catalog_cache.version()
+    return get_catalog_version()
+
+
+# Функция для вычисления ETag страницы по состоянию каталога и параметрам запроса
+def page_etag(state, *parts):
+    payload = repr((PAGE_TEMPLATE_VERSION, state) + parts)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+# Класс кэша отрендеренных фрагментов каталога в памяти процесса.
+# Фрагменты зависят только от фильтров, версии каталога и манифеста ресурсов (адресов изображений),
+# поэтому при изменении любой из версий кэш очищается целиком
+class FragmentCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # Ключ фильтров -> HTML фрагмента
+        self._state = None  # Версии каталога и манифеста, для которых построены фрагменты
+        self._modified = None  # Время, когда процесс впервые увидел текущее состояние
+
+    # Метод для получения текущего состояния и времени его изменения (для Last-Modified)
+    def state(self):
+        state = (current_catalog_version(), asset_manifest.version())
+        with self._lock:
+            if state != self._state:
+                self._entries.clear()
+                self._state = state
+                self._modified = datetime.now(timezone.utc).replace(microsecond=0)
+            return state, self._modified
+
+    # Метод для получения фрагмента из кэша или его рендеринга и сохранения.
+    # Фрагмент, отрендеренный для устаревшего состояния, не сохраняется
+    def get_or_render(self, state, key, render):
+        if not current_app.config['PAGE_CACHE_ENABLED']:
+            return render()
+        with self._lock:
+            if self._state == state and key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        html = render()
+        with self._lock:
+            if self._state == state:
+                self._entries[key] = html
+                while len(self._entries) > current_app.config['PAGE_CACHE_MAX_SIZE']:
+                    self._entries.popitem(last=False)
+        return html
+
+    # Метод для очистки кэша
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._state = None
+
+
+# Общий экземпляр кэша фрагментов для процесса
+fragment_cache = FragmentCache()
@@ -0,0 +1,81 @@
+import threading  # Импорт threading для ограничения числа ожидающих задач
+from concurrent.futures import ThreadPoolExecutor  # Импорт пула потоков для вычисления bcrypt
+
+from flask import current_app
+from sqlalchemy import or_, select
+
+from models import db, bcrypt, User
+
+
+# Исключение, которое означает, что очередь хэширования паролей переполнена
+class PasswordServiceBusy(Exception):
+    pass
+
+
+# Класс сервиса хэширования паролей. bcrypt намеренно медленный, поэтому одновременно
+# выполняется не больше PASSWORD_WORKERS вычислений, а в очереди ждёт не больше
+# PASSWORD_QUEUE_LIMIT запросов; остальные сразу получают отказ, не занимая рабочие процессы
+class PasswordService:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+
+    # Метод для ленивого создания пула потоков и семафора очереди по настройкам приложения
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                workers = current_app.config['PASSWORD_WORKERS']
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+                self._slots = threading.BoundedSemaphore(workers + current_app.config['PASSWORD_QUEUE_LIMIT'])
+        return self._executor
+
+    # Метод для выполнения функции в пуле с ограничением очереди
+    def _run(self, fn, *args):
+        executor = self._get_executor()
+        if not self._slots.acquire(timeout=current_app.config['PASSWORD_QUEUE_TIMEOUT']):
+            raise PasswordServiceBusy()
+        try:
+            return executor.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    # Метод для хэширования пароля с текущей стоимостью BCRYPT_LOG_ROUNDS
+    def hash(self, password):
+        rounds = current_app.config['BCRYPT_LOG_ROUNDS']
+        return self._run(bcrypt.generate_password_hash, password, rounds).decode('utf-8')
+
+    # Метод для проверки пароля
+    def check(self, hashed_password, password):
+        return self._run(bcrypt.check_password_hash, hashed_password, password)
+
+    # Метод для проверки, что хэш создан с другой стоимостью и его нужно пересчитать
+    @staticmethod
+    def needs_rehash(hashed_password):
+        try:
+            rounds = int(hashed_password.split('$')[2])
+        except (IndexError, ValueError):
+            return True
+        return rounds != current_app.config['BCRYPT_LOG_ROUNDS']
+
+    # Метод для входа: проверка пароля и прозрачный пересчёт хэша при изменении стоимости
+    def authenticate(self, user, password):
+        if not self.check(user.password, password):
+            return False
+        if self.needs_rehash(user.password):
+            user.password = self.hash(password)
+            db.session.commit()
+        return True
+
+
+# Функция для проверки занятости email и имени пользователя одним запросом.
+# Возвращает пару флагов (email занят, имя пользователя занято)
+def find_taken(email, username):
+    rows = db.session.execute(
+        select(User.email, User.username).where(or_(User.email == email, User.username == username)).limit(2)
+    ).all()
+    return any(row.email == email for row in rows), any(row.username == username for row in rows)
+
+
+# Общий экземпляр сервиса хэширования паролей для процесса
+password_service = PasswordService()
@@ -0,0 +1,162 @@
+import os  # Импорт os для файлов-отметок состояния задач
+import threading  # Импорт threading для защиты реестра задач
+import time  # Импорт time для удаления устаревших задач и измерения длительности задач
+from functools import partial  # Импорт partial для передачи параметров задачи в обработчик завершения
+from collections import namedtuple  # Импорт namedtuple для описания задачи
+from concurrent.futures import ProcessPoolExecutor  # Импорт пула процессов для генерации документов
+from concurrent.futures.process import BrokenProcessPool  # Импорт исключения для пула с аварийно завершившимся процессом
+
+from flask import current_app
+
+from documents import prepare_templates, render_document
+from doc_cache import document_cache, write_document
+from metrics import DOCUMENT_JOB_DURATION
+
+# Задача генерации документа: ключ документа, владелец, формат и future из пула процессов
+RenderJob = namedtuple('RenderJob', ['key', 'user_id', 'kind', 'order_number', 'future', 'created_at'])
+
+
+# Исключение, которое означает, что очередь генерации документов переполнена
+class RenderQueueFull(Exception):
+    pass
+
+
+# Исключение, которое означает, что пул процессов генерации неработоспособен (процесс завершился аварийно).
+# Пул пересоздаётся при следующей отправке, поэтому для клиента это та же временная недоступность
+class RenderPoolBroken(RenderQueueFull):
+    pass
+
+
+# Поддиректория дискового кэша с отметками состояния задач: <ключ>.<формат>.pending — задача поставлена
+# в очередь, <ключ>.<формат>.failed — генерация завершилась ошибкой. По отметкам статус задачи видят
+# все рабочие процессы, а не только тот, который её принял. Отметки не учитываются при вытеснении кэша
+JOB_MARKERS_DIR = 'jobs'
+
+
+# Функция для получения пути к отметке состояния задачи
+def _marker_path(directory, key, kind, state):
+    return os.path.join(directory, JOB_MARKERS_DIR, f'{key}.{kind}.{state}')
+
+
+# Функция для записи отметки состояния задачи (в файле — время записи)
+def write_marker(directory, key, kind, state):
+    os.makedirs(os.path.join(directory, JOB_MARKERS_DIR), exist_ok=True)
+    with open(_marker_path(directory, key, kind, state), 'w') as f:
+        f.write(str(time.time()))
+
+
+# Функция для удаления отметки состояния задачи
+def remove_marker(directory, key, kind, state):
+    try:
+        os.remove(_marker_path(directory, key, kind, state))
+    except FileNotFoundError:
+        pass
+
+
+# Функция для получения возраста отметки состояния задачи в секундах (None, если отметки нет)
+def marker_age(directory, key, kind, state):
+    try:
+        return time.time() - os.stat(_marker_path(directory, key, kind, state)).st_mtime
+    except FileNotFoundError:
+        return None
+
+
+# Функция, которая выполняется в процессе пула: генерация документа и атомарная запись в директорию
+# дискового кэша. Документ появляется в кэше сразу, поэтому его готовность видят все рабочие процессы,
+# использующие эту директорию; после записи снимается отметка ожидания. Возвращает размер файла
+def render_to_cache(directory, key, kind, order, order_number):
+    data = render_document(kind, order, order_number)
+    write_document(directory, key, kind, data)
+    remove_marker(directory, key, kind, 'pending')
+    return len(data)
+
+
+# Класс фоновой генерации документов в отдельных процессах.
+# Генерация PDF/DOCX нагружает процессор и удерживает GIL, поэтому она
+# выносится из процесса, обрабатывающего запросы
+class RenderQueue:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._jobs = {}  # Ключ документа -> RenderJob
+        self._pending = 0  # Количество задач в очереди и в работе
+
+    # Метод для ленивого создания пула процессов; шаблоны документов готовятся один раз в каждом процессе
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=current_app.config['RENDER_WORKERS'],
+                initializer=prepare_templates
+            )
+        return self._executor
+
+    # Метод, который вызывается пулом по завершении задачи: учёт длительности и размера кэша.
+    # При ошибке (в том числе при аварийном завершении процесса пула) отметка ожидания заменяется отметкой ошибки
+    def _on_done(self, key, kind, started, directory, max_bytes, future):
+        DOCUMENT_JOB_DURATION.observe(time.perf_counter() - started, kind)
+        with self._lock:
+            self._pending -= 1
+        if not future.cancelled() and future.exception() is None:
+            document_cache.account(directory, future.result(), max_bytes)
+            return
+        write_marker(directory, key, kind, 'failed')
+        remove_marker(directory, key, kind, 'pending')
+
+    # Метод для удаления завершённых задач старше RENDER_JOB_TTL секунд
+    def _prune(self, now, ttl):
+        expired = [key for key, job in self._jobs.items() if job.future.done() and now - job.created_at > ttl]
+        for key in expired:
+            del self._jobs[key]
+
+    # Метод для постановки задачи в очередь. Повторная отправка того же документа
+    # возвращает уже существующую задачу. При переполнении очереди выбрасывается RenderQueueFull
+    def submit(self, key, user_id, kind, order, order_number):
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now, current_app.config['RENDER_JOB_TTL'])
+            job = self._jobs.get(key)
+            if job is not None and not (job.future.done() and job.future.exception() is not None):
+                return job
+            if self._pending >= current_app.config['RENDER_QUEUE_LIMIT']:
+                raise RenderQueueFull()
+            directory = current_app.config['DOCUMENT_CACHE_DIR']
+            write_marker(directory, key, kind, 'pending')
+            remove_marker(directory, key, kind, 'failed')
+            try:
+                future = self._get_executor().submit(render_to_cache, directory, key, kind, order, order_number)
+            except BrokenProcessPool:
+                remove_marker(directory, key, kind, 'pending')
+                self._executor.shutdown(wait=False)
+                self._executor = None
+                raise RenderPoolBroken()
+            self._pending += 1
+            job = RenderJob(key, user_id, kind, order_number, future, now)
+            self._jobs[key] = job
+        future.add_done_callback(partial(self._on_done, key, kind, time.perf_counter(), directory,
+                                         current_app.config['DOCUMENT_CACHE_MAX_BYTES']))
+        return job
+
+    # Метод для получения статуса задачи: 'pending', 'running', 'done' или 'failed' (None, если задачи нет).
+    # Задача другого рабочего процесса определяется по отметкам не старше RENDER_JOB_TTL секунд.
+    # Готовый документ уже записан в дисковый кэш, откуда его отдаёт обычный маршрут скачивания
+    def status(self, key, kind):
+        with self._lock:
+            job = self._jobs.get(key)
+        if job is None:
+            directory = current_app.config['DOCUMENT_CACHE_DIR']
+            ttl = current_app.config['RENDER_JOB_TTL']
+            for state in ('failed', 'pending'):
+                age = marker_age(directory, key, kind, state)
+                if age is not None and age <= ttl:
+                    return state
+            return None
+        future = job.future
+        if not future.done():
+            return 'running' if future.running() else 'pending'
+        if future.exception() is not None:
+            return 'failed'
+        return 'done'
+
+
+# Общий экземпляр очереди генерации документов для процесса
+render_queue = RenderQueue()
@@ -0,0 +1,335 @@
+from flask import Blueprint, current_app, abort, render_template, make_response, url_for, flash, redirect, request, session, send_file, send_from_directory, jsonify, stream_with_context
+from models import db, User, Order, normalize_name
+from forms import RegistrationForm, LoginForm
+from flask_login import login_user, current_user, logout_user, login_required
+from decorators import admin_required
+from catalog import parse_range, format_range
+from order_batcher import submit_order, OrderBatchTimeout
+from search import search_flowers, parse_paging, page_count
+from autocomplete import prefix_index
+from documents import MIMETYPES, order_document_data
+from doc_cache import document_cache
+from render_jobs import render_queue, RenderQueueFull
+from export import iter_orders, stream_orders_archive, orders_for_day, delivery_slips_pdf
+from passwords import password_service, PasswordServiceBusy, find_taken
+from assets import asset_url, flower_image
+from page_cache import fragment_cache, page_etag
+from metrics import ResolverTimingMiddleware, render_metrics
+from markupsafe import Markup
+from werkzeug.http import is_resource_modified
+import io
+import mimetypes
+from datetime import date, datetime
+import os
+
+# Blueprint с маршрутами магазина
+main = Blueprint('main', __name__)
+
+# Функция для добавления в шаблоны адресов собранных ресурсов
+@main.app_context_processor
+def inject_assets():
+    return {'asset_url': asset_url, 'flower_image': flower_image}
+
+# Маршрут для главной страницы
+@main.route('/', methods=['GET', 'POST'])
+def index():
+    if request.method == 'POST':
+        if not current_user.is_authenticated:
+            flash('Пожалуйста, войдите в систему, чтобы сделать заказ.', 'danger')
+            return redirect(url_for('main.login'))
+
+        name = request.form['name']
+        address = request.form['address']
+        flower_types = request.form.getlist('flower_type')
+        message = request.form['message']
+
+        quantities = []
+        for flower_type in flower_types:
+            try:
+                quantity = int(request.form.get(f'quantity_{flower_type.lower()}', 0))
+            except ValueError:
+                quantity = 0
+            if quantity < 1:
+                flash('Укажите количество для каждого выбранного цветка.', 'danger')
+                return redirect(url_for('main.index'))
+            quantities.append((flower_type, quantity))
+
+        try:
+            submit_order(current_user.id, name, address, message, quantities)
+        except ValueError as e:
+            flash(str(e), 'danger')
+            return redirect(url_for('main.index'))
+        except OrderBatchTimeout:
+            flash('Не удалось дождаться подтверждения заказа. Проверьте список заказов в профиле перед повторной отправкой.', 'warning')
+            return redirect(url_for('main.profile'))
+
+        session['order_created'] = True  # Установка переменной сессии для указания, что заказ был создан
+        return redirect(url_for('main.index'))
+
+    search_query = request.args.get('search', '')
+    length_range = parse_range(request.args.get('length', ''))
+    price_range = parse_range(request.args.get('price', ''))
+    # Фильтры приводятся к каноническому виду, чтобы одинаковые запросы использовали один фрагмент кэша
+    length_filter = format_range(length_range)
+    price_filter = format_range(price_range)
+    needle = normalize_name(search_query)
+
+    sort, page, per_page = parse_paging(request.args)
+    state, last_modified = fragment_cache.state()
+
+    # Страница без уведомлений зависит только от состояния каталога, параметров запроса и входа пользователя,
+    # поэтому браузер может проверить её по ETag без повторного рендеринга
+    etag = None
+    if 'order_created' not in session and not session.get('_flashes'):
+        etag = page_etag(state, search_query, length_filter, price_filter, sort, page, per_page, current_user.is_authenticated)
+        if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+            response = current_app.response_class(status=304)
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+
+    # Функция для рендеринга сетки цветов с переключателем страниц (выполняется только при промахе кэша)
+    def render_grid():
+        results = search_flowers(needle, length_range, price_range, sort, page, per_page)
+        return render_template('flower_grid.html', flowers=results.items, results=results, pages=page_count(results),
+                               search_query=needle, length_filter=length_filter, price_filter=price_filter)
+
+    grid = fragment_cache.get_or_render(state, (needle, length_filter, price_filter, sort, page, per_page), render_grid)
+
+    order_created = session.pop('order_created', False)  # Проверка и удаление переменной сессии
+    response = make_response(render_template('index.html', grid=Markup(grid), sort=sort, search_query=search_query, length_filter=length_filter, price_filter=price_filter, order_created=order_created))
+    if etag:
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+    return response
+
+# Маршрут API для постраничного поиска цветов в формате JSON
+@main.route('/api/flowers')
+def api_flowers():
+    search_query = request.args.get('search', '')
+    length_range = parse_range(request.args.get('length', ''))
+    price_range = parse_range(request.args.get('price', ''))
+    sort, page, per_page = parse_paging(request.args)
+
+    results = search_flowers(search_query, length_range, price_range, sort, page, per_page)
+    return jsonify({
+        'items': [
+            {'id': flower.id, 'name': flower.name, 'image_url': flower.image_url, 'length': flower.length, 'price': flower.price}
+            for flower in results.items
+        ],
+        'total': results.total,
+        'page': results.page,
+        'per_page': results.per_page,
+        'pages': page_count(results),
+        'sort': results.sort
+    })
+
+# Маршрут API для подсказок при вводе названия цветка: префиксный индекс в памяти,
+# без обращения к базе данных на каждое нажатие клавиши
+@main.route('/api/flowers/suggest')
+def api_flowers_suggest():
+    query = request.args.get('q', '')
+    limit = request.args.get('limit', current_app.config['AUTOCOMPLETE_LIMIT'], type=int)
+    limit = min(max(limit, 1), current_app.config['AUTOCOMPLETE_MAX_LIMIT'])
+    suggestions = prefix_index.suggest(query, limit, current_app.config['AUTOCOMPLETE_TYPO_MIN_LENGTH'])
+    return jsonify({
+        'query': query,
+        'items': [
+            {'id': flower.id, 'name': flower.name, 'price': flower.price, 'typo': typo}
+            for flower, typo in suggestions
+        ]
+    })
+
+# Маршрут для страницы регистрации
+@main.route('/register', methods=['GET', 'POST'])
+def register():
+    if current_user.is_authenticated:
+        return redirect(url_for('main.index'))
+    form = RegistrationForm()
+    if form.validate_on_submit():
+        email_exists, username_exists = find_taken(form.email.data, form.username.data)
+        if email_exists:
+            flash('Email уже зарегистрирован. Пожалуйста, используйте другой email.', 'danger')
+        elif username_exists:
+            flash('Имя пользователя уже занято. Пожалуйста, используйте другое имя пользователя.', 'danger')
+        else:
+            try:
+                hashed_password = password_service.hash(form.password.data)
+            except PasswordServiceBusy:
+                flash('Сервис перегружен. Пожалуйста, повторите попытку позже.', 'danger')
+                return render_template('register.html', form=form), 503
+            user = User(username=form.username.data, email=form.email.data, password=hashed_password)
+            db.session.add(user)
+            db.session.commit()
+            flash('Ваша учётная запись создана! Теперь вы можете войти.', 'success')
+            return redirect(url_for('main.login'))
+    return render_template('register.html', form=form)
+
+# Маршрут для страницы входа
+@main.route('/login', methods=['GET', 'POST'])
+def login():
+    if current_user.is_authenticated:
+        return redirect(url_for('main.index'))
+    form = LoginForm()
+    if form.validate_on_submit():
+        user = User.query.filter_by(email=form.email.data).first()
+        try:
+            authenticated = user is not None and password_service.authenticate(user, form.password.data)
+        except PasswordServiceBusy:
+            flash('Сервис перегружен. Пожалуйста, повторите попытку позже.', 'danger')
+            return render_template('login.html', form=form), 503
+        if authenticated:
+            login_user(user, remember=form.remember.data)
+            next_page = request.args.get('next')
+            return redirect(next_page) if next_page else redirect(url_for('main.index'))
+        else:
+            flash('Неудачный вход. Пожалуйста, проверьте email и пароль.', 'danger')
+    return render_template('login.html', form=form)
+
+# Маршрут для страницы профиля
+@main.route('/profile')
+@login_required
+def profile():
+    orders = Order.query.filter_by(user_id=current_user.id).order_by(Order.id).all()
+    return render_template('profile.html', user=current_user, orders=orders)
+
+# Маршрут для выхода из системы
+@main.route('/logout')
+def logout():
+    logout_user()
+    return redirect(url_for('main.login'))
+
+# Представление GraphQL создаётся при первом обращении, чтобы graphene и схема
+# не загружались в процессах, которые не обслуживают /graphql
+_graphql_view = None
+
+def graphql():
+    global _graphql_view
+    if _graphql_view is None:
+        from graphql_documents import PersistedQueryView, graphql_document_cache
+        from schema import schema
+        _graphql_view = PersistedQueryView.as_view('graphql', schema=schema, graphiql=True, backend=graphql_document_cache,
+                                                   middleware=[ResolverTimingMiddleware()])
+    return _graphql_view()
+
+# Добавление маршрута для GraphQL
+main.add_url_rule('/graphql', view_func=admin_required(graphql), methods=['GET', 'POST'])
+
+# Маршрут для метрик производительности процесса в текстовом формате Prometheus
+@main.route('/metrics')
+@admin_required
+def metrics():
+    return current_app.response_class(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+# Функция для отправки документа заказа с поддержкой условных запросов (ETag)
+def send_order_document(order_id, kind):
+    order = Order.query.get_or_404(order_id)
+    if order.user_id != current_user.id:
+        abort(403)
+
+    order_number = order.number
+    order_data = order_document_data(order)
+    etag = document_cache.key_for(kind, order_data, order_number)
+
+    # Повторное скачивание неизменившегося документа: ответ 304 без генерации файла
+    if etag in request.if_none_match:
+        response = current_app.response_class(status=304)
+    else:
+        data = document_cache.get_or_render(etag, kind, order_data, order_number)
+        response = send_file(io.BytesIO(data), as_attachment=True, download_name=f'order_{order_number}.{kind}', mimetype=MIMETYPES[kind])
+    response.set_etag(etag)
+    response.cache_control.no_cache = None
+    response.cache_control.private = True
+    response.cache_control.max_age = current_app.config['DOCUMENT_CACHE_MAX_AGE']
+    return response
+
+# Маршрут для скачивания DOCX
+@main.route('/download/docx/<int:order_id>')
+@login_required
+def download_docx(order_id):
+    return send_order_document(order_id, 'docx')
+
+# Маршрут для скачивания PDF
+@main.route('/download/pdf/<int:order_id>')
+@login_required
+def download_pdf(order_id):
+    return send_order_document(order_id, 'pdf')
+
+# Маршрут для выгрузки всех заказов пользователя одним ZIP-архивом, который передаётся по частям
+@main.route('/export/<any(pdf, docx):kind>')
+@login_required
+def export_my_orders(kind):
+    orders = iter_orders(current_user.id, current_app.config['EXPORT_BATCH_SIZE'])
+    response = current_app.response_class(stream_with_context(stream_orders_archive(orders, kind)), mimetype='application/zip')
+    response.headers['Content-Disposition'] = f'attachment; filename=orders_{kind}.zip'
+    return response
+
+# Маршрут для печати накладных курьерам: все заказы за сутки (по умолчанию текущие, UTC) одним PDF
+@main.route('/admin/slips')
+@admin_required
+def delivery_slips():
+    try:
+        day = date.fromisoformat(request.args['date']) if request.args.get('date') else datetime.utcnow().date()
+    except ValueError:
+        abort(400)
+    orders = orders_for_day(day)
+    if not orders:
+        abort(404)
+    return send_file(io.BytesIO(delivery_slips_pdf(orders)), as_attachment=True,
+                     download_name=f'slips_{day.isoformat()}.pdf', mimetype=MIMETYPES['pdf'])
+
+# Маршрут для фоновой генерации документа: POST ставит задачу в очередь, GET возвращает её статус.
+# Идентификатор задачи совпадает с ключом документа в кэше, поэтому готовность видна всем процессам
+@main.route('/render/<any(pdf, docx):kind>/<int:order_id>', methods=['GET', 'POST'])
+@login_required
+def render_document_job(kind, order_id):
+    order = Order.query.get_or_404(order_id)
+    if order.user_id != current_user.id:
+        abort(403)
+
+    order_data = order_document_data(order)
+    key = document_cache.key_for(kind, order_data, order.number)
+
+    status = 'done' if document_cache.contains(key, kind) else render_queue.status(key, kind)
+    if request.method == 'POST' and status in (None, 'failed'):
+        try:
+            render_queue.submit(key, current_user.id, kind, order_data, order.number)
+        except RenderQueueFull:
+            response = jsonify({'job_id': key, 'status': 'busy'})
+            response.status_code = 503
+            response.headers['Retry-After'] = str(current_app.config['RENDER_RETRY_AFTER'])
+            return response
+        status = 'pending'
+    if status is None:
+        return jsonify({'job_id': key, 'status': 'unknown'}), 404
+
+    result = {
+        'job_id': key,
+        'status': status,
+        'status_url': url_for('main.render_document_job', kind=kind, order_id=order_id)
+    }
+    if status == 'done':
+        result['download_url'] = url_for(f'main.download_{kind}', order_id=order_id)
+    return jsonify(result), 202 if status in ('pending', 'running') else 200
+
+# Маршрут для ресурсов с отпечатком содержимого в имени: такой файл никогда не меняется,
+# поэтому браузер хранит его без повторных проверок. Клиентам с поддержкой gzip отдаётся заранее сжатая версия
+@main.route('/assets/<path:filename>')
+def asset(filename):
+    if filename == 'manifest.json':
+        abort(404)
+    directory = current_app.config['ASSETS_DIR']
+    max_age = current_app.config['ASSETS_MAX_AGE']
+    compressed = filename + '.gz'
+    if 'gzip' in request.accept_encodings and os.path.isfile(os.path.join(directory, compressed)):
+        response = send_from_directory(directory, compressed, mimetype=mimetypes.guess_type(filename)[0], max_age=max_age)
+        response.content_encoding = 'gzip'
+    else:
+        response = send_from_directory(directory, filename, max_age=max_age)
+    response.vary.add('Accept-Encoding')
+    response.cache_control.immutable = True
+    return response
@@ -1,5 +1,15 @@
+import base64  # Импорт base64 для кодирования курсоров постраничной выборки
 import graphene  # Импорт библиотеки graphene для работы с GraphQL
-from models import db, Flower as FlowerModel, Order as OrderModel  # Импорт моделей и базы данных из models
+from graphene.relay import Connection, PageInfo  # Импорт типов Relay-соединений
+from graphene.utils.str_converters import to_snake_case  # Импорт преобразования имён полей GraphQL в имена атрибутов
+from graphql.language import ast  # Импорт узлов AST запроса для определения запрошенных полей
+from sqlalchemy.orm import load_only  # Импорт load_only для загрузки только нужных столбцов
+from models import db, normalize_name, Flower as FlowerModel, Order as OrderModel, User as UserModel  # Импорт моделей и базы данных из models
+from models import SalesDaily, SalesByFlower, SalesByUser  # Импорт моделей сводок продаж
+from loaders import get_loaders  # Импорт пакетных загрузчиков связанных записей
+from catalog_import import validate_flower_row  # Импорт проверки строк каталога для пакетных мутаций
+from catalog import commit_catalog_change  # Импорт фиксации изменений каталога со сбросом кэша
+from assets import build_flower_images  # Импорт генерации уменьшенных изображений цветов
 
 # Определение GraphQL типа для модели Flower
 class FlowerType(graphene.ObjectType):
@@ -17,19 +27,232 @@ class OrderType(graphene.ObjectType):
     flower_type = graphene.String()  # Тип цветов в заказе
     message = graphene.String()  # Сообщение к заказу
     user_id = graphene.Int()  # Идентификатор пользователя
+    number = graphene.Int()  # Порядковый номер заказа у пользователя
+    user = graphene.Field(lambda: UserType)  # Пользователь, сделавший заказ
+
+    # Метод для разрешения поля user через пакетный загрузчик
+    def resolve_user(self, info):
+        return get_loaders()['user'].load(self.user_id)
+
+# Определение GraphQL типа для модели User (пароль не публикуется)
+class UserType(graphene.ObjectType):
+    id = graphene.Int()  # Идентификатор пользователя
+    username = graphene.String()  # Имя пользователя
+    email = graphene.String()  # Email пользователя
+    role = graphene.String()  # Роль пользователя
+    orders = graphene.List(OrderType)  # Заказы пользователя
+
+    # Метод для разрешения поля orders через пакетный загрузчик
+    def resolve_orders(self, info):
+        return get_loaders()['orders_by_user'].load(self.id)
+
+# Определение GraphQL типа для сводки продаж за день
+class SalesDayType(graphene.ObjectType):
+    day = graphene.Date()  # День (UTC)
+    orders_count = graphene.Int()  # Количество заказов
+    items_count = graphene.Int()  # Количество проданных цветов
+    revenue = graphene.Float()  # Выручка
+
+# Определение GraphQL типа для сводки продаж по цветку
+class SalesFlowerType(graphene.ObjectType):
+    flower_name = graphene.String()  # Название цветка
+    flower_id = graphene.Int()  # Идентификатор цветка
+    orders_count = graphene.Int()  # Количество заказов с этим цветком
+    quantity = graphene.Int()  # Количество проданных цветов
+    revenue = graphene.Float()  # Выручка
+
+# Определение GraphQL типа для сводки продаж по пользователю
+class SalesUserType(graphene.ObjectType):
+    user_id = graphene.Int()  # Идентификатор пользователя
+    user = graphene.Field(UserType)  # Пользователь
+    orders_count = graphene.Int()  # Количество заказов
+    items_count = graphene.Int()  # Количество купленных цветов
+    revenue = graphene.Float()  # Сумма заказов
+
+    # Метод для разрешения поля user через пакетный загрузчик
+    def resolve_user(self, info):
+        return get_loaders()['user'].load(self.user_id)
+
+# Relay-соединения для постраничной выборки цветов и заказов
+class FlowerConnection(Connection):
+    class Meta:
+        node = FlowerType
+
+class OrderConnection(Connection):
+    class Meta:
+        node = OrderType
+
+class UserConnection(Connection):
+    class Meta:
+        node = UserType
+
+# Максимальное количество записей на одной странице соединения
+MAX_PAGE_SIZE = 500
+
+# Функция для кодирования курсора по идентификатору записи
+def encode_cursor(record_id):
+    return base64.b64encode('cursor:{}'.format(record_id).encode()).decode()
+
+# Функция для декодирования курсора в идентификатор записи
+def decode_cursor(cursor):
+    try:
+        prefix, record_id = base64.b64decode(cursor).decode().split(':')
+        if prefix != 'cursor':
+            raise ValueError
+        return int(record_id)
+    except ValueError:
+        raise ValueError('Некорректный курсор: {}'.format(cursor))
+
+# Функция для сбора имён полей из набора выборки с учётом фрагментов
+def _collect_fields(selection_set, fragments):
+    fields = {}
+    for selection in selection_set.selections:
+        if isinstance(selection, ast.Field):
+            fields[selection.name.value] = selection
+        elif isinstance(selection, ast.FragmentSpread):
+            fields.update(_collect_fields(fragments[selection.name.value].selection_set, fragments))
+        elif isinstance(selection, ast.InlineFragment):
+            fields.update(_collect_fields(selection.selection_set, fragments))
+    return fields
+
+# Функция для определения полей, запрошенных клиентом, по пути внутри ответа (например, edges -> node)
+def selected_fields(info, path=()):
+    fields = {}
+    for field_ast in info.field_asts:
+        if field_ast.selection_set is not None:
+            fields.update(_collect_fields(field_ast.selection_set, info.fragments))
+    for name in path:
+        field_ast = fields.get(name)
+        if field_ast is None or field_ast.selection_set is None:
+            return set()
+        fields = _collect_fields(field_ast.selection_set, info.fragments)
+    return {to_snake_case(name) for name in fields}
+
+# Функция для построения опции загрузки только запрошенных столбцов модели (id загружается всегда).
+# Для запрошенных связей загружаются столбцы внешнего ключа, которые нужны загрузчикам
+def project_columns(model, info, path=()):
+    columns = model.__table__.columns.keys()
+    relationships = model.__mapper__.relationships
+    names = {'id'}
+    for name in selected_fields(info, path):
+        if name in columns:
+            names.add(name)
+        elif name in relationships:
+            names.update(column.key for column in relationships[name].local_columns)
+    return load_only(*[getattr(model, name) for name in names])
+
+# Функция для постраничной выборки по курсору (keyset pagination): следующая страница
+# начинается с записи, id которой больше id последней записи предыдущей страницы
+def paginate_keyset(query, model, connection_type, first, after):
+    first = min(max(first, 1), MAX_PAGE_SIZE)
+    if after:
+        query = query.filter(model.id > decode_cursor(after))
+    rows = query.order_by(model.id).limit(first + 1).all()
+    has_next_page = len(rows) > first
+    rows = rows[:first]
+    edges = [connection_type.Edge(node=row, cursor=encode_cursor(row.id)) for row in rows]
+    page_info = PageInfo(
+        has_next_page=has_next_page,
+        has_previous_page=after is not None,
+        start_cursor=edges[0].cursor if edges else None,
+        end_cursor=edges[-1].cursor if edges else None
+    )
+    return connection_type(edges=edges, page_info=page_info)
 
 # Определение запросов GraphQL
 class Query(graphene.ObjectType):
     all_flowers = graphene.List(FlowerType)  # Запрос всех цветов
     all_orders = graphene.List(OrderType)  # Запрос всех заказов
 
+    # Постраничный запрос цветов с фильтрами по названию, цене и длине
+    flowers = graphene.Field(
+        FlowerConnection,
+        first=graphene.Int(default_value=50),
+        after=graphene.String(),
+        name_contains=graphene.String(),
+        min_price=graphene.Float(),
+        max_price=graphene.Float(),
+        min_length=graphene.Float(),
+        max_length=graphene.Float()
+    )
+
+    # Постраничный запрос заказов с фильтрами по пользователю и имени получателя
+    orders = graphene.Field(
+        OrderConnection,
+        first=graphene.Int(default_value=50),
+        after=graphene.String(),
+        user_id=graphene.Int(),
+        name_contains=graphene.String()
+    )
+
+    # Постраничный запрос пользователей
+    users = graphene.Field(
+        UserConnection,
+        first=graphene.Int(default_value=50),
+        after=graphene.String(),
+        role=graphene.String()
+    )
+
+    # Запросы сводок продаж: читают готовые агрегаты, а не заказы
+    sales_by_day = graphene.List(SalesDayType, date_from=graphene.Date(), date_to=graphene.Date())
+    sales_by_flower = graphene.List(SalesFlowerType, limit=graphene.Int(default_value=20))
+    sales_by_user = graphene.List(SalesUserType, limit=graphene.Int(default_value=20))
+
     # Метод для разрешения запроса all_flowers
     def resolve_all_flowers(self, info):
-        return FlowerModel.query.all()
+        return FlowerModel.query.options(project_columns(FlowerModel, info)).all()
 
     # Метод для разрешения запроса all_orders
     def resolve_all_orders(self, info):
-        return OrderModel.query.all()
+        return OrderModel.query.options(project_columns(OrderModel, info)).all()
+
+    # Метод для разрешения запроса flowers
+    def resolve_flowers(self, info, first, after=None, name_contains=None, min_price=None, max_price=None, min_length=None, max_length=None):
+        query = FlowerModel.query.options(project_columns(FlowerModel, info, ('edges', 'node')))
+        if name_contains:
+            query = query.filter(FlowerModel.search_name.contains(normalize_name(name_contains), autoescape=True))
+        if min_price is not None:
+            query = query.filter(FlowerModel.price >= min_price)
+        if max_price is not None:
+            query = query.filter(FlowerModel.price <= max_price)
+        if min_length is not None:
+            query = query.filter(FlowerModel.length >= min_length)
+        if max_length is not None:
+            query = query.filter(FlowerModel.length <= max_length)
+        return paginate_keyset(query, FlowerModel, FlowerConnection, first, after)
+
+    # Метод для разрешения запроса orders
+    def resolve_orders(self, info, first, after=None, user_id=None, name_contains=None):
+        query = OrderModel.query.options(project_columns(OrderModel, info, ('edges', 'node')))
+        if user_id is not None:
+            query = query.filter(OrderModel.user_id == user_id)
+        if name_contains:
+            query = query.filter(OrderModel.name.contains(name_contains, autoescape=True))
+        return paginate_keyset(query, OrderModel, OrderConnection, first, after)
+
+    # Метод для разрешения запроса users
+    def resolve_users(self, info, first, after=None, role=None):
+        query = UserModel.query.options(project_columns(UserModel, info, ('edges', 'node')))
+        if role is not None:
+            query = query.filter(UserModel.role == role)
+        return paginate_keyset(query, UserModel, UserConnection, first, after)
+
+    # Метод для разрешения запроса sales_by_day
+    def resolve_sales_by_day(self, info, date_from=None, date_to=None):
+        query = SalesDaily.query
+        if date_from is not None:
+            query = query.filter(SalesDaily.day >= date_from)
+        if date_to is not None:
+            query = query.filter(SalesDaily.day <= date_to)
+        return query.order_by(SalesDaily.day).all()
+
+    # Метод для разрешения запроса sales_by_flower (по убыванию выручки)
+    def resolve_sales_by_flower(self, info, limit):
+        return SalesByFlower.query.order_by(SalesByFlower.revenue.desc()).limit(min(max(limit, 1), MAX_PAGE_SIZE)).all()
+
+    # Метод для разрешения запроса sales_by_user (по убыванию суммы заказов)
+    def resolve_sales_by_user(self, info, limit):
+        return SalesByUser.query.order_by(SalesByUser.revenue.desc()).limit(min(max(limit, 1), MAX_PAGE_SIZE)).all()
 
 # Определение мутации для создания цветка
 class CreateFlower(graphene.Mutation):
@@ -45,7 +268,8 @@ class CreateFlower(graphene.Mutation):
     def mutate(self, info, name, image_url, length, price):
         flower = FlowerModel(name=name, image_url=image_url, length=length, price=price)
         db.session.add(flower)
-        db.session.commit()
+        commit_catalog_change()
+        build_flower_images([flower.image_url])
         return CreateFlower(flower=flower)
 
 # Определение мутации для удаления цветка
@@ -60,7 +284,7 @@ class DeleteFlower(graphene.Mutation):
         flower = FlowerModel.query.get(id)
         if flower:
             db.session.delete(flower)
-            db.session.commit()
+            commit_catalog_change()
             return DeleteFlower(success=True)
         return DeleteFlower(success=False)
 
@@ -69,32 +293,132 @@ class UpdateFlower(graphene.Mutation):
     class Arguments:
         id = graphene.Int(required=True)  # Аргумент: идентификатор цветка
         name = graphene.String()  # Аргумент: название цветка
+        image_url = graphene.String()  # Аргумент: URL изображения
         length = graphene.Float()  # Аргумент: длина цветка
         price = graphene.Float()  # Аргумент: цена цветка
 
     flower = graphene.Field(FlowerType)  # Поле возвращаемого типа
 
     # Метод для обновления цветка
-    def mutate(self, info, id, name=None, length=None, price=None):
+    def mutate(self, info, id, name=None, image_url=None, length=None, price=None):
         flower = FlowerModel.query.get(id)
         if not flower:
             return UpdateFlower(flower=None)
 
         if name is not None:
             flower.name = name
+        if image_url is not None:
+            flower.image_url = image_url
         if length is not None:
             flower.length = length
         if price is not None:
             flower.price = price
 
-        db.session.commit()
+        commit_catalog_change()
+        build_flower_images([flower.image_url])
         return UpdateFlower(flower=flower)
 
+# Определение GraphQL типа для ошибки в строке пакетной мутации
+class RowErrorType(graphene.ObjectType):
+    index = graphene.Int()  # Номер строки во входном списке (с нуля)
+    message = graphene.String()  # Описание ошибки
+
+# Входные данные для создания цветка в пакетной мутации
+class FlowerInput(graphene.InputObjectType):
+    name = graphene.String(required=True)  # Название цветка
+    image_url = graphene.String(required=True)  # URL изображения
+    length = graphene.Float(required=True)  # Длина цветка
+    price = graphene.Float(required=True)  # Цена цветка
+
+# Входные данные для обновления цветка в пакетной мутации
+class FlowerUpdateInput(graphene.InputObjectType):
+    id = graphene.Int(required=True)  # Идентификатор цветка
+    name = graphene.String()  # Название цветка
+    image_url = graphene.String()  # URL изображения
+    length = graphene.Float()  # Длина цветка
+    price = graphene.Float()  # Цена цветка
+
+# Определение пакетной мутации для создания цветов: все корректные строки добавляются одной транзакцией
+class CreateFlowers(graphene.Mutation):
+    class Arguments:
+        flowers = graphene.List(graphene.NonNull(FlowerInput), required=True)  # Аргумент: список цветов
+
+    flowers = graphene.List(FlowerType)  # Созданные цветы
+    errors = graphene.List(RowErrorType)  # Ошибки в отдельных строках
+
+    # Метод для создания цветов
+    def mutate(self, info, flowers):
+        created, errors = [], []
+        for index, row in enumerate(flowers):
+            values, error = validate_flower_row(row)
+            if error:
+                errors.append(RowErrorType(index=index, message=error))
+                continue
+            created.append(FlowerModel(**values))
+        if created:
+            db.session.add_all(created)
+            commit_catalog_change()
+            build_flower_images([flower.image_url for flower in created])
+        return CreateFlowers(flowers=created, errors=errors)
+
+# Определение пакетной мутации для обновления цветов: цветы загружаются одним запросом и сохраняются одной транзакцией
+class UpdateFlowers(graphene.Mutation):
+    class Arguments:
+        flowers = graphene.List(graphene.NonNull(FlowerUpdateInput), required=True)  # Аргумент: список изменений
+
+    flowers = graphene.List(FlowerType)  # Обновлённые цветы
+    errors = graphene.List(RowErrorType)  # Ошибки в отдельных строках
+
+    # Метод для обновления цветов
+    def mutate(self, info, flowers):
+        ids = [row.id for row in flowers]
+        existing = {flower.id: flower for flower in FlowerModel.query.filter(FlowerModel.id.in_(ids)).all()}
+        updated, errors = [], []
+        for index, row in enumerate(flowers):
+            values, error = validate_flower_row(row, partial=True)
+            values = values and {field: value for field, value in values.items() if field != 'id'}
+            flower = existing.get(row.id)
+            if not error and flower is None:
+                error = 'Цветок с id {} не найден'.format(row.id)
+            if error:
+                errors.append(RowErrorType(index=index, message=error))
+                continue
+            for field, value in values.items():
+                setattr(flower, field, value)
+            updated.append(flower)
+        if updated:
+            commit_catalog_change()
+            build_flower_images([flower.image_url for flower in updated])
+        return UpdateFlowers(flowers=updated, errors=errors)
+
+# Определение пакетной мутации для удаления цветов одним запросом DELETE
+class DeleteFlowers(graphene.Mutation):
+    class Arguments:
+        ids = graphene.List(graphene.NonNull(graphene.Int), required=True)  # Аргумент: идентификаторы цветов
+
+    deleted_ids = graphene.List(graphene.Int)  # Идентификаторы удалённых цветов
+    errors = graphene.List(RowErrorType)  # Ошибки в отдельных строках
+
+    # Метод для удаления цветов
+    def mutate(self, info, ids):
+        found = set(db.session.execute(db.select(FlowerModel.id).where(FlowerModel.id.in_(ids))).scalars())
+        errors = [
+            RowErrorType(index=index, message='Цветок с id {} не найден'.format(flower_id))
+            for index, flower_id in enumerate(ids) if flower_id not in found
+        ]
+        if found:
+            db.session.execute(db.delete(FlowerModel).where(FlowerModel.id.in_(found)))
+            commit_catalog_change()
+        return DeleteFlowers(deleted_ids=sorted(found), errors=errors)
+
 # Определение корневой мутации
 class Mutation(graphene.ObjectType):
     create_flower = CreateFlower.Field()  # Мутация для создания цветка
     delete_flower = DeleteFlower.Field()  # Мутация для удаления цветка
     update_flower = UpdateFlower.Field()  # Мутация для обновления цветка
+    create_flowers = CreateFlowers.Field()  # Пакетная мутация для создания цветов
+    update_flowers = UpdateFlowers.Field()  # Пакетная мутация для обновления цветов
+    delete_flowers = DeleteFlowers.Field()  # Пакетная мутация для удаления цветов
 
 # Создание схемы GraphQL
 schema = graphene.Schema(query=Query, mutation=Mutation)
\ No newline at end of file
@@ -0,0 +1,119 @@
+from collections import namedtuple  # Импорт namedtuple для описания страницы результатов
+
+from flask import current_app
+from sqlalchemy import Integer, column, func, select, text
+
+from models import db, Flower, normalize_name
+from catalog import catalog_cache
+
+# Минимальная длина запроса для поиска по триграммному индексу FTS5
+FTS_MIN_QUERY_LENGTH = 3
+
+# SQL для создания полнотекстового индекса по нормализованным названиям цветов
+# и триггеров, которые поддерживают его в актуальном состоянии
+FTS_SCHEMA = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS flower_fts USING fts5("
+    "search_name, content='flower', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS flower_fts_ai AFTER INSERT ON flower BEGIN "
+    "INSERT INTO flower_fts(rowid, search_name) VALUES (new.id, new.search_name); END",
+    "CREATE TRIGGER IF NOT EXISTS flower_fts_ad AFTER DELETE ON flower BEGIN "
+    "INSERT INTO flower_fts(flower_fts, rowid, search_name) VALUES ('delete', old.id, old.search_name); END",
+    "CREATE TRIGGER IF NOT EXISTS flower_fts_au AFTER UPDATE ON flower BEGIN "
+    "INSERT INTO flower_fts(flower_fts, rowid, search_name) VALUES ('delete', old.id, old.search_name); "
+    "INSERT INTO flower_fts(rowid, search_name) VALUES (new.id, new.search_name); END",
+]
+
+# Доступные варианты сортировки: ключ в URL -> (атрибут, по убыванию)
+SORT_OPTIONS = {
+    'name': ('search_name', False),
+    'price': ('price', False),
+    '-price': ('price', True),
+    'length': ('length', False),
+    '-length': ('length', True),
+}
+DEFAULT_SORT = 'name'
+
+# Страница результатов поиска
+SearchPage = namedtuple('SearchPage', ['items', 'total', 'page', 'per_page', 'sort'])
+
+
+# Функция для вычисления количества страниц
+def page_count(search_page):
+    return max(1, -(-search_page.total // search_page.per_page))
+
+
+# Функция для проверки, что база данных поддерживает FTS5 (используется только SQLite)
+def fts_available():
+    return db.engine.dialect.name == 'sqlite'
+
+
+# Функция для создания полнотекстового индекса, если таблицы создавались через db.create_all()
+def ensure_search_index():
+    if not fts_available():
+        return
+    exists = db.session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'flower_fts'")
+    ).first()
+    if exists:
+        return
+    for statement in FTS_SCHEMA:
+        db.session.execute(text(statement))
+    db.session.execute(text("INSERT INTO flower_fts(flower_fts) VALUES ('rebuild')"))
+    db.session.commit()
+
+
+# Функция для разбора параметров страницы и сортировки из запроса
+def parse_paging(args):
+    sort = args.get('sort', DEFAULT_SORT)
+    if sort not in SORT_OPTIONS:
+        sort = DEFAULT_SORT
+    per_page = args.get('per_page', current_app.config['CATALOG_PAGE_SIZE'], type=int)
+    per_page = min(max(per_page, 1), current_app.config['CATALOG_MAX_PAGE_SIZE'])
+    page = max(args.get('page', 1, type=int), 1)
+    return sort, page, per_page
+
+
+# Функция для поиска цветов в базе данных с использованием индексов
+def search_flowers_db(search_query, length_range, price_range, sort, page, per_page):
+    query = select(Flower)
+    needle = normalize_name(search_query)
+    if needle:
+        if fts_available() and len(needle) >= FTS_MIN_QUERY_LENGTH:
+            phrase = '"{}"'.format(needle.replace('"', '""'))
+            matches = (
+                text('SELECT rowid FROM flower_fts WHERE flower_fts MATCH :phrase')
+                .bindparams(phrase=phrase)
+                .columns(column('rowid', Integer))
+            )
+            query = query.where(Flower.id.in_(matches))
+        else:
+            query = query.where(Flower.search_name.contains(needle, autoescape=True))
+    if length_range:
+        query = query.where(Flower.length.between(*length_range))
+    if price_range:
+        query = query.where(Flower.price.between(*price_range))
+
+    total = db.session.execute(select(func.count()).select_from(query.subquery())).scalar()
+
+    attribute, descending = SORT_OPTIONS[sort]
+    sort_column = getattr(Flower, attribute)
+    query = query.order_by(sort_column.desc() if descending else sort_column, Flower.id)
+    items = db.session.execute(query.limit(per_page).offset((page - 1) * per_page)).scalars().all()
+    return SearchPage(items, total, page, per_page, sort)
+
+
+# Функция для поиска цветов в кэше каталога с сортировкой и разбиением на страницы в памяти
+def search_flowers_cached(search_query, length_range, price_range, sort, page, per_page):
+    records = catalog_cache.filter(search_query, length_range, price_range)
+    attribute, descending = SORT_OPTIONS[sort]
+    # Записи кэша уже упорядочены по id, а сортировка устойчива
+    records.sort(key=lambda record: getattr(record, attribute), reverse=descending)
+    start = (page - 1) * per_page
+    return SearchPage(records[start:start + per_page], len(records), page, per_page, sort)
+
+
+# Функция для поиска цветов: через кэш каталога, если он включён, иначе через базу данных
+def search_flowers(search_query='', length_range=None, price_range=None, sort=DEFAULT_SORT, page=1, per_page=24):
+    if current_app.config['CATALOG_CACHE_ENABLED']:
+        return search_flowers_cached(search_query, length_range, price_range, sort, page, per_page)
+    return search_flowers_db(search_query, length_range, price_range, sort, page, per_page)
@@ -0,0 +1,131 @@
+import threading  # Импорт threading для защиты кэша
+import time  # Импорт time для срока жизни записей кэша
+from collections import namedtuple  # Импорт namedtuple для неизменяемого снимка пользователя
+
+from flask import current_app
+from flask_login import UserMixin
+from sqlalchemy import event, inspect, insert, select, update
+from sqlalchemy.orm import Session, object_session
+
+from models import db, User, UserVersion
+
+
+# Неизменяемый снимок пользователя для Flask-Login: только те поля, которые нужны
+# шаблонам и проверкам прав, без пароля и без привязки к сессии SQLAlchemy
+class UserSnapshot(namedtuple('UserSnapshot', ['id', 'username', 'email', 'role']), UserMixin):
+    __slots__ = ()
+
+
+# Функция для получения текущей версии пользователей из базы данных
+def get_user_version():
+    version = db.session.execute(select(UserVersion.version).where(UserVersion.id == 1)).scalar()
+    return version or 0
+
+
+# Класс кэша пользователей с ограниченным сроком жизни записей и явной инвалидацией.
+# Не чаще раза в USER_VERSION_CHECK_INTERVAL секунд кэш сверяет версию пользователей с базой данных
+# и очищается при её изменении, поэтому смена роли в другом процессе (например, командой set_role)
+# действует во всех рабочих процессах не позже чем через этот интервал
+class UserCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # id пользователя -> (время истечения, UserSnapshot)
+        self._version = None  # Версия пользователей, для которой действительны записи
+        self._checked_at = 0.0  # Время последней сверки версии с базой данных
+
+    # Метод для сверки версии пользователей с базой данных (не чаще раза в интервал)
+    def _check_version(self, now):
+        with self._lock:
+            if now - self._checked_at < current_app.config['USER_VERSION_CHECK_INTERVAL']:
+                return
+        version = get_user_version()
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            self._checked_at = now
+
+    # Метод для получения снимка пользователя из кэша или из базы данных
+    def get(self, user_id):
+        now = time.monotonic()
+        self._check_version(now)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                return entry[1]
+
+        row = db.session.execute(
+            select(User.id, User.username, User.email, User.role).where(User.id == user_id)
+        ).first()
+        if row is None:
+            self.invalidate(user_id)
+            return None
+
+        snapshot = UserSnapshot(*row)
+        with self._lock:
+            if len(self._entries) >= current_app.config['USER_CACHE_MAX_SIZE']:
+                # Вытеснение самой старой записи (словарь хранит порядок добавления)
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[user_id] = (now + current_app.config['USER_CACHE_TTL'], snapshot)
+        return snapshot
+
+    # Метод для удаления пользователя из кэша
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    # Метод для полной очистки кэша
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Общий экземпляр кэша пользователей для процесса
+user_cache = UserCache()
+
+
+# Увеличение версии пользователей при изменении полей снимка или удалении пользователя через ORM.
+# Версия меняется в той же транзакции, что и данные, а записи кэша текущего процесса
+# сбрасываются только после commit (при откате изменения не было)
+def _bump_user_version(connection, target):
+    result = connection.execute(
+        update(UserVersion.__table__).where(UserVersion.id == 1).values(version=UserVersion.version + 1)
+    )
+    if result.rowcount == 0:
+        connection.execute(insert(UserVersion.__table__).values(id=1, version=1))
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('changed_users', set()).add(target.id)
+
+
+# Обработчик изменения пользователя: версия увеличивается, только если изменились поля снимка
+# (например, пересчёт хэша пароля при входе кэш не сбрасывает)
+@event.listens_for(User, 'after_update')
+def _user_updated(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in UserSnapshot._fields):
+        _bump_user_version(connection, target)
+
+
+# Обработчик удаления пользователя
+@event.listens_for(User, 'after_delete')
+def _user_deleted(mapper, connection, target):
+    _bump_user_version(connection, target)
+
+
+# Сброс записей кэша изменённых пользователей после commit
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_users(session):
+    for user_id in session.info.pop('changed_users', ()):
+        user_cache.invalidate(user_id)
+
+
+# Забывание изменённых пользователей при откате транзакции
+@event.listens_for(Session, 'after_rollback')
+def _forget_changed_users(session):
+    session.info.pop('changed_users', None)
+
+
+# Функция для загрузки пользователя по ID, необходимая для Flask-Login (регистрируется в create_app)
+def load_user(user_id):
+    return user_cache.get(int(user_id))